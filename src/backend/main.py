@@ -18,6 +18,10 @@ MONGO_SERVER = os.getenv("MONGO_SERVER", "mongodb://localhost:27017")
 MONGO_INITDB_ROOT_USERNAME = os.getenv("MONGO_INITDB_ROOT_USERNAME", "root")
 MONGO_INITDB_ROOT_PASSWORD = os.getenv("MONGO_INITDB_ROOT_PASSWORD", "example")
 
+# 知識庫的 ingestion profile（需與 core 的 cfg/ingest_settings.py INGEST_PROFILES 一致）
+INGEST_PROFILES = ("text", "text_tables", "full")
+DEFAULT_INGEST_PROFILE = "full"
+
 # 設定SQLAlchemy
 Base = declarative_base()
 engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
@@ -109,9 +113,14 @@ async def new_kb(kb: dict):
         "name": "Knowledge Base Name",
         "desc": "Knowledge Base Description",
         "icon": "Knowledge Base Icon",
-        "owner": "Owner Username"
+        "owner": "Owner Username",
+        "ingest_profile": "text" | "text_tables" | "full" (optional, default "full")
     }
     """
+    ingest_profile = kb.get("ingest_profile") or DEFAULT_INGEST_PROFILE
+    if ingest_profile not in INGEST_PROFILES:
+        raise HTTPException(status_code=400, detail=f"Unknown ingestion profile: {ingest_profile}")
+
     # check if the knowledge base already exists
     if mongo_client["knowledge_base"].kb.find_one({"name": kb["name"], "owner": kb["owner"]}):
         raise HTTPException(status_code=400, detail="Knowledge base already exists")
@@ -133,6 +142,7 @@ async def new_kb(kb: dict):
         "icon": kb["icon"],
         "owner": kb["owner"],
         "bucket_name": bucket_name,  # 儲存 bucket 名稱
+        "ingest_profile": ingest_profile,  # core /process_file 依此選擇解析方式
         "created_at": datetime.utcnow()
     })
     
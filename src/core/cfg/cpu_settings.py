@@ -0,0 +1,11 @@
+import os
+
+# Total cores the core service may use (default: every core of the box)
+CPU_TOTAL_CORES = int(os.getenv("CPU_TOTAL_CORES", os.cpu_count() or 1))
+
+# Share of CPU_TOTAL_CORES given to each role; whatever is left serves HTTP requests
+CPU_SHARES = {
+    "ingest_parse": 0.45, # docling layout / table / OCR models
+    "ingest_embed": 0.30, # ONNX sessions used by QdrantVecStore
+    "query_embed": 0.15,  # ONNX sessions used by /search
+}
@@ -12,4 +12,28 @@ IMG_EMB_DIM = 512
 # TABLE data
 TABLE_CHUNK_MAX_TOKENS = 66
 TABLE_EMB_MODEL = "intfloat/multilingual-e5-large"
-TABLE_EMB_DIM = 1024
\ No newline at end of file
+TABLE_EMB_DIM = 1024
+
+# QUERY embedding cache
+QUERY_CACHE_MAX_ENTRIES = 4096 # max cached (model, query) vectors, 0 disables the cache
+QUERY_CACHE_TTL_SECONDS = 3600 # entries older than this are re-embedded
+
+# QUERY embedding micro-batching
+EMB_BATCH_MAX_SIZE = 32 # max queries embedded together in one model call
+EMB_BATCH_MAX_WAIT_MS = 5 # how long the first query of a batch waits for company
+
+# INGESTION embedding batches
+INGEST_EMB_BATCH_SIZE = 64 # text / table chunks per model call
+INGEST_IMG_EMB_BATCH_SIZE = 16 # pictures per model call
+
+# Embedding precision for EMB_MODEL / TABLE_EMB_MODEL
+# "fp32" -> original ONNX export, "int8" -> dynamically quantized ONNX export (see INT8_MODEL_SOURCES)
+EMB_PRECISION = "fp32"
+INT8_MODEL_SOURCES = {
+    # model name: (HF repo holding the quantized export, ONNX file inside that repo)
+    "intfloat/multilingual-e5-large": ("Xenova/multilingual-e5-large", "onnx/model_quantized.onnx"),
+}
+
+# INGESTION embedding disk cache (content-addressed, sha256(model + text))
+INGEST_EMB_CACHE_ENABLED = True
+INGEST_EMB_CACHE_DIR = "/root/mortis/emb_cache"
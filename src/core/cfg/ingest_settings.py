@@ -0,0 +1,69 @@
+# Background ingestion
+INGEST_WORKERS = 1 # worker threads consuming the /process_file job queue
+INGEST_JOBS_COLLECTION = "ingest_jobs" # MongoDB collection (db "mortis") holding job / per-file progress
+
+# Streaming ingestion (parse -> embed -> upsert per page window)
+INGEST_STREAMING = True
+INGEST_PAGE_WINDOW = 8 # pages converted per docling call
+INGEST_QUEUE_SIZE = 2 # windows buffered between two pipeline stages
+
+# Parallel multi-file ingestion: >1 spreads the files of a job over this many worker processes
+INGEST_PROCESSES = 1
+
+# Objects up to this size are read from MinIO into memory, larger ones spill to a private temp file
+INGEST_SPOOL_MAX_BYTES = 64 * 1024 * 1024
+
+# Content-hash manifest (db "mortis") used to skip files that are already ingested
+INGEST_MANIFEST_COLLECTION = "ingest_manifest"
+
+# Page-window checkpoints (db "mortis") of files being streamed, so that jobs interrupted by a
+# restart resume after the last uploaded window; queued / running jobs are re-queued on startup
+INGEST_CHECKPOINT_COLLECTION = "ingest_checkpoints"
+INGEST_RESUME_JOBS = True
+
+# Ingestion profiles, chosen per knowledge base (field "ingest_profile" of the KB record)
+# tables   -> docling table structure model + table chunks
+# pictures -> render pictures (at images_scale) and embed them for image search
+# ocr      -> "auto": OCR only pages without a usable text layer, "always" / "never"
+INGEST_PROFILES = {
+    "text": {"tables": False, "pictures": False, "images_scale": 1.0, "ocr": "auto"},
+    "text_tables": {"tables": True, "pictures": False, "images_scale": 1.0, "ocr": "auto"},
+    "full": {"tables": True, "pictures": True, "images_scale": 2.0, "ocr": "auto"},
+}
+DEFAULT_INGEST_PROFILE = "full" # profile of knowledge bases created without one
+
+# Text-layer fast path (streaming ingestion): pages with a usable text layer are read with
+# pypdfium2 instead of the docling layout / OCR pipeline
+INGEST_FAST_PARSE = True
+INGEST_FAST_MIN_CHARS = 80 # readable characters a page's text layer needs
+INGEST_FAST_MAX_PATHS = 30 # more drawn paths than this (table rulings) sends the page to docling when tables are indexed
+
+# Selective OCR (profiles with ocr="auto"): a page is OCR'd when its text layer is missing or broken
+INGEST_OCR_LANG = ["eng", "chi_tra"] # Tesseract languages
+INGEST_OCR_MIN_CHARS = 20 # fewer readable characters than this -> no usable text layer
+INGEST_OCR_MAX_BAD_RATIO = 0.1 # share of undecodable / private-use characters above which the text layer is broken
+INGEST_OCR_IMAGE_COVERAGE = 0.6 # pages mostly covered by images with less than INGEST_FAST_MIN_CHARS characters count as scanned
+
+# Qdrant upserts during ingestion: batches of INGEST_UPSERT_BATCH_SIZE points are sent over
+# INGEST_UPSERT_PARALLEL connections; the end of each file waits for all of them. The defaults
+# keep the previous behaviour (one request per page window and collection, waiting for Qdrant)
+# until utils/bench_ingest has been run against a Qdrant instance; candidates are e.g.
+# 256 / 4 / False.
+INGEST_UPSERT_BATCH_SIZE = 0 # 0: all points of a window and collection in one request
+INGEST_UPSERT_PARALLEL = 1
+INGEST_UPSERT_WAIT = True # False: batches return once logged, before Qdrant has applied them
+
+# Bulk load: new collections are created with HNSW indexing off (indexing_threshold=0); once a
+# file is uploaded indexing is switched back on and the file is only reported after optimization.
+# Off by default until measured with utils/bench_ingest (config "...:bulk") against a Qdrant instance.
+INGEST_BULK_LOAD = False
+INGEST_INDEXING_THRESHOLD = 20000 # KB, Qdrant's default
+INGEST_OPTIMIZE_TIMEOUT_SECONDS = 600 # give up waiting (the index keeps building in Qdrant)
+INGEST_OPTIMIZE_POLL_SECONDS = 1.0
+
+# Memory ceiling for ingestion (process RSS, MB; 0 = no ceiling). Above INGEST_MEMORY_SOFT_RATIO of
+# it the page window is halved (down to one page), well below it grows back to INGEST_PAGE_WINDOW.
+# A ceiling also forces streaming ingestion.
+INGEST_MEMORY_LIMIT_MB = 0
+INGEST_MEMORY_SOFT_RATIO = 0.8
+INGEST_RSS_SAMPLE_SECONDS = 0.5 # peak RSS sampling interval while a file is ingested
@@ -1,3 +1,4 @@
+import asyncio
 import json
 import logging
 import os
@@ -12,21 +13,27 @@ import numpy as np
 import polars as pl
 
 from minio import Minio
-from fastembed import TextEmbedding
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse
 from pathlib import Path
 from typing import List, Dict, Any, Optional, Union, Tuple
 
 # Import Qdrant implementations
 from utils.embedding import add_emb_cond
+from utils.query_cache import aembed_query, embed_queries, query_cache
+from utils.embed_batcher import batcher_stats
+from utils.warmup import start_preload, readiness
+from utils.ingest_jobs import IngestJobs
+from utils.ingest_worker import run_file
+from utils.ingest_pool import run_files_parallel
 from utils.qdrant_indexing import qdrant_indexing, add_qdrant_index_into_condition 
-from utils.qdrant_search import qdrant_search, qdrant_hybrid_search, qdrant_coordinate_search
-from utils.parse import convert
+from utils.qdrant_search import qdrant_search, qdrant_batch_search, qdrant_hybrid_search, qdrant_coordinate_search
 from utils.qdrant_store import save_vec_store as save_vec_store_func
 from utils.qdrant_store import list_all_tables as list_all_tables_func
 from utils.qdrant_store import list_all_tables_mongo as list_all_tables_mongo_func
 
-from cfg.emb_settings import IMG_CLIP_EMB_MODEL, IMG_EMB_SEARCH_METRIC
+from cfg.emb_settings import EMB_MODEL, IMG_CLIP_EMB_MODEL, IMG_EMB_SEARCH_METRIC
+from cfg.ingest_settings import INGEST_JOBS_COLLECTION, INGEST_PROCESSES, INGEST_PROFILES, DEFAULT_INGEST_PROFILE
 
 # Set to True to use Qdrant, False to use Infinity
 USE_QDRANT = True
@@ -56,11 +63,18 @@ Path("/root/mortis/temp").mkdir(parents=True, exist_ok=True)
 
 # Define function aliases
 search_func = qdrant_search
+batch_search_func = qdrant_batch_search
 hybrid_search_func = qdrant_hybrid_search
 coordinate_search_func = qdrant_coordinate_search
 indexing_func = qdrant_indexing
 add_index_into_condition_func = add_qdrant_index_into_condition
 
+@app.on_event("startup")
+def preload_models():
+    # Load embedding / docling models in the background; /ready reports when done.
+    # With a process pool the ingestion models live in the worker processes instead.
+    start_preload(ingest=INGEST_PROCESSES <= 1)
+
 @app.get("/")
 def read_root():
     return {"Hello": "World"}
@@ -85,6 +99,27 @@ def health_check():
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
+@app.get("/ready")
+def ready_check():
+    """
+    Readiness endpoint: 200 once every configured model is loaded and warmed up,
+    503 while preloading is still running or failed
+    """
+    state = readiness()
+    if state["ready"]:
+        return {"status": "ready", "steps": state["steps"]}
+    return JSONResponse(
+        status_code=503,
+        content={"status": "error" if state["error"] else "loading", **state}
+    )
+
+@app.get("/query_cache_stats")
+def query_cache_stats():
+    """
+    Hit/miss counters of the query embedding cache and micro-batcher sizes
+    """
+    return {"status": "success", "stats": query_cache.stats(), "batchers": batcher_stats()}
+
 @app.get("/minio_connect_test")
 def minio_connect_test():
     try:
@@ -99,13 +134,85 @@ def minio_connect_test():
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
+def run_ingest_job(job_id: str, task_queue: dict, jobs: IngestJobs):
+    """
+    Process every file of an ingestion job (runs on an ingest worker thread).
+    Each file commits its entry to index_info when it is done, so a job resumed
+    after a restart only runs the files that had not finished.
+    """
+    # find the kb_name in MongoDB
+    kb_name = task_queue.get("kb_name", "")
+    kb_owner = task_queue.get("kb_owner", "")
+    mongo_collection = mongo_db[kb_owner]
+    index_info = mongo_collection.find_one({"kb_name": kb_name})
+    if index_info is None:
+        index_info = {
+            "kb_name": kb_name,
+            "files": [],
+        }
+        mongo_collection.insert_one(index_info)
+    # Files whose content is already indexed are skipped via the ingestion manifest;
+    # files already indexed under the same name are updated in place
+    profile = task_queue.get("ingest_profile", DEFAULT_INGEST_PROFILE)
+    tasks = [{**task, "ingest_profile": profile} for task in task_queue["task_queue"]]
+    previous = {f["file_name"]: f for f in index_info.get("files", [])}
+    job = jobs.collection.find_one({"job_id": job_id}, {"files.status": 1})
+    finished = {
+        idx for idx, f in enumerate(job.get("files", []))
+        if f.get("status") in ("success", "deduplicated", "error")
+    }
+
+    if INGEST_PROCESSES > 1 and len(tasks) - len(finished) > 1:
+        # Spread the files over the worker process pool
+        result = run_files_parallel(jobs.collection, job_id, tasks, kb_owner, previous, skip=finished)
+        entries, throughput = result["entries"], result["throughput"]
+    else:
+        started = time.perf_counter()
+        entries = [
+            run_file(jobs.collection, job_id, idx, task, kb_owner, previous.get(task["file_name"]))
+            for idx, task in enumerate(tasks) if idx not in finished
+        ]
+        seconds = time.perf_counter() - started
+        done = sum(1 for e in entries if e is not None)
+        throughput = {
+            "files": done,
+            "seconds": round(seconds, 3),
+            "files_per_minute": round(done / seconds * 60, 2) if seconds > 0 else 0.0,
+        }
+    # Duplicates and peak RSS of the (worker) process over all files of the job, resumed or not
+    job = jobs.collection.find_one({"job_id": job_id}, {"files.file_name": 1, "files.duplicate_of": 1, "files.peak_rss_mb": 1})
+    deduplicated = [
+        {"file_name": f["file_name"], "duplicate_of": f["duplicate_of"]}
+        for f in job.get("files", []) if f.get("duplicate_of") is not None
+    ]
+    peaks = [f["peak_rss_mb"] for f in job.get("files", []) if f.get("peak_rss_mb") is not None]
+    jobs.collection.update_one(
+        {"job_id": job_id},
+        {"$set": {"throughput": throughput, "deduplicated": deduplicated, "peak_rss_mb": max(peaks, default=None)}}
+    )
+
+ingest_jobs = IngestJobs(mongo_db[INGEST_JOBS_COLLECTION], run_ingest_job)
+
+def kb_ingest_profile(kb_name: str, kb_owner: str) -> str:
+    """Ingestion profile stored on the knowledge base record by backend /new_kb"""
+    kb = mongo_client["knowledge_base"].kb.find_one({"name": kb_name, "owner": kb_owner}, {"ingest_profile": 1})
+    return (kb or {}).get("ingest_profile") or DEFAULT_INGEST_PROFILE
+
+@app.on_event("startup")
+def start_ingest_workers():
+    ingest_jobs.start()
+
 @app.post("/process_file")
 async def process_file(task_queue:dict):
     """
+    Queue the files for ingestion and return a job id right away.
+    Progress is reported by GET /jobs/{job_id}.
+
     payload:
     {
         "kb_name": "knowledge_base_name",
         "kb_owner": "knowledge_base_owner",
+        "ingest_profile": "text", // optional, defaults to the profile of the knowledge base
         "task_queue": [
             {
                 "kb_name": "knowledge_base_name",
@@ -116,64 +223,31 @@ async def process_file(task_queue:dict):
     }
     """
     try:
-        client = Minio(
-            "minio:9000",
-            access_key=MINIO_USER,
-            secret_key=MINIO_PASSWORD,
-            secure=False,
-        )
-        # find the kb_name in MongoDB
-        kb_name = task_queue.get("kb_name", "")
-        kb_owner = task_queue.get("kb_owner", "")
-        mongo_collection = mongo_db[kb_owner]
-        index_info = mongo_collection.find_one({"kb_name": kb_name})
-        if index_info is None:
-            index_info = {
-                "kb_name": kb_name,
-                "files": [],
-            }
-            mongo_collection.insert_one(index_info)
-        else:
-            index_info = {
-                "kb_name": kb_name,
-                "files": index_info["files"],
-            }
-        for task in task_queue["task_queue"]:
-            kb_name:str = task["kb_name"]
-            file_name = task["file_name"]
-            if len(index_info["files"]) != 0:
-                for file in index_info["files"]:
-                    if file["file_name"] == file_name:continue # If the file already exists, skip it
-            client.fget_object(kb_name.lower(), file_name, "/root/mortis/temp/" + file_name)
-            # Process the file
-            # Convert the file to dict
-            logging.info(f"Processing file: {file_name}")
-            data, meta_data = convert("/root/mortis/temp/" + file_name)
-            # Save the vector store
-            logging.info(f"Converting Complete, saving to vector store...")
-            status = save_vec_store_func(kb_name, file_name, data, meta_data)
-            logging.info(f"status: {status}, texts_collection_name: {status['texts_collection_name']}, images_collection_name: {status['images_collection_name']}")
-            # Save the index information
-            index_info["files"].append({
-                "file_name": file_name,
-                "status": status['status'],
-                "texts_table_name": status['texts_collection_name'],
-                "images_table_name": status['images_collection_name'],
-                "tables_table_name": status['tables_collection_name'],
-            })
-            # Remove file
-            os.remove("/root/mortis/temp/" + file_name)
-        # Write index infomation to MongoDB
-        mongo_collection.update_one(
-            {"kb_name": kb_name},
-            {"$set": index_info},
-            upsert=True
-        )
-        return {"status": "success", "message": "File processed successfully"}
+        profile = task_queue.get("ingest_profile") or kb_ingest_profile(task_queue.get("kb_name", ""), task_queue.get("kb_owner", ""))
+        if profile not in INGEST_PROFILES:
+            return {"status": "error", "message": f"Unknown ingestion profile: {profile}"}
+        job_id = ingest_jobs.submit({**task_queue, "ingest_profile": profile})
+        return {"status": "success", "message": "File processing queued", "job_id": job_id}
     except Exception as e:
-        # return {"status": "error", "message": str(e)+" "+str(e.__traceback__.tb_lineno)}
         return {"status": "error", "message": str(traceback.format_exc())}
 
+@app.get("/jobs/{job_id}")
+async def get_job(job_id:str):
+    """
+    Status of an ingestion job with per-file stage, timings and errors
+    """
+    job = ingest_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"status": "success", "job": job}
+
+@app.get("/jobs")
+async def list_jobs(kb_owner:str = None, limit:int = 50):
+    """
+    Most recent ingestion jobs, optionally filtered by owner
+    """
+    return {"status": "success", "jobs": ingest_jobs.list(kb_owner, limit)}
+
 @app.get("/list_tables/{kb_owner}/{kb_name}")
 async def list_tables(kb_owner:str, kb_name:str):
     """
@@ -224,6 +298,9 @@ async def search(data:dict):
     pprint.pprint(data)
     try:
         return_tables = []
+        # Embed the query once, batched with concurrent requests
+        query_text = data["conditions"]["text"][0]['query']
+        query_vector = await aembed_query(EMB_MODEL, query_text)
         for table in data["tables"]:
             # Text data
             index_name = indexing_func(
@@ -234,7 +311,7 @@ async def search(data:dict):
                 data["conditions"],
                 index_name
             )
-            update_condition = add_emb_cond(update_condition)
+            update_condition = add_emb_cond(update_condition, query_vector)
             # search
             result = search_func(
                 db_name=data["kb_name"],
@@ -294,7 +371,7 @@ async def search(data:dict):
                     data["conditions"],
                     index_name
                 )
-                update_condition = add_emb_cond(update_condition)
+                update_condition = add_emb_cond(update_condition, query_vector)
                 # search
                 result = search_func(
                     db_name=data["kb_name"],
@@ -323,7 +400,6 @@ async def search(data:dict):
             # image data
             if data["do_image_search"]:
                 print("Image search")
-                clip_text_model = TextEmbedding(IMG_CLIP_EMB_MODEL)
                 image_result = search_func(
                     db_name=data["kb_name"],
                     collection_name=table[1],
@@ -332,7 +408,7 @@ async def search(data:dict):
                         "dense": [
                             {
                                 "field": "embedding",
-                                "query": list(clip_text_model.embed(data["conditions"]["text"][0]['query']))[0],
+                                "query": await aembed_query(IMG_CLIP_EMB_MODEL, query_text),
                                 "element_type": "float",
                                 "metric": IMG_EMB_SEARCH_METRIC,
                                 "topn": data["limit"]
@@ -369,6 +445,89 @@ async def search(data:dict):
     except Exception as e:
         return {"status": "error", "message": str(traceback.format_exc())}
 
+def _result_to_dict(result, return_format: str):
+    if return_format == "pl":# type -> pl.DataFrame
+        return result.to_dict(as_series=False)
+    elif return_format == "pd":# type -> pd.DataFrame
+        return result.to_dict()
+    elif return_format == "arrow":# type -> pyarrow.Table
+        return result.to_pydict()
+    elif return_format == "raw":
+        return result
+    raise ValueError("Invalid return format")
+
+@app.post("/search_batch")
+async def search_batch(data:dict):
+    """
+    Run many queries against the same tables in one call.
+
+    All queries are embedded in one model call and sent to Qdrant with a
+    single batch search per collection.
+
+    Json Example:
+    ```python
+    {
+        "kb_name": "knowledge_base_name",
+        "tables": [
+            ["texts_table_name", "images_table_name", "tables_table_name"],
+            ...
+        ],
+        "queries": ["query_text_1", "query_text_2"],
+        "select_cols": ["*"],
+        "filter": [],  # optional, same syntax as conditions["filter"] in /search
+        "do_image_search": false,
+        "limit": 10,
+        "return_format": "pl"
+    }
+    ```
+    """
+    try:
+        queries = data["queries"]
+        return_format = data.get("return_format", "pl")
+        limit = data.get("limit", 10)
+        select_cols = data.get("select_cols", ["*"])
+        filters = data.get("filter")
+        # ONNX inference and the Qdrant calls run in worker threads, off the event loop
+        text_vectors = await asyncio.to_thread(embed_queries, EMB_MODEL, queries)
+        image_vectors = None
+        if data.get("do_image_search", False):
+            image_vectors = await asyncio.to_thread(embed_queries, IMG_CLIP_EMB_MODEL, queries)
+
+        per_query = [[] for _ in queries]
+        for table in data["tables"]:
+            targets = [(table[0], text_vectors, select_cols), (table[2], text_vectors, select_cols)]
+            if image_vectors is not None:
+                targets.append((table[1], image_vectors, ["image"]))
+            # A file without texts / tables / pictures reports that table name as ""
+            targets = [target for target in targets if target[0] != ""]
+            for collection_name, vectors, cols in targets:
+                results = await asyncio.to_thread(
+                    batch_search_func,
+                    db_name=data["kb_name"],
+                    collection_name=collection_name,
+                    select_cols=cols,
+                    query_vectors=vectors,
+                    filters=filters,
+                    limit=limit,
+                    return_format=return_format
+                )
+                for idx, result in enumerate(results):
+                    per_query[idx].append({
+                        "table_name": collection_name,
+                        "result": _result_to_dict(result, return_format)
+                    })
+
+        return {
+            "status": "success",
+            "kb_name": data["kb_name"],
+            "results": [
+                {"query": query, "tables": tables}
+                for query, tables in zip(queries, per_query)
+            ]
+        }
+    except Exception as e:
+        return {"status": "error", "message": str(traceback.format_exc())}
+
 if __name__ == "__main__":
     
     uvicorn.run(app, host=HOST, port=14514, log_level="info")
\ No newline at end of file
@@ -0,0 +1,5 @@
+# The core service imports its modules relative to src/core (cfg, utils)
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,142 @@
+"""
+Page classification behind the text-layer fast path and selective OCR
+(utils/fast_parse). Pages are stand-ins exposing the few pypdfium2 calls
+classify_pages makes, so no PDF is needed.
+"""
+
+import pypdfium2.raw as pdfium_c
+
+from cfg.ingest_settings import INGEST_PROFILES
+from cfg.ingest_settings import INGEST_FAST_MIN_CHARS, INGEST_FAST_MAX_PATHS
+from cfg.ingest_settings import INGEST_OCR_MIN_CHARS, INGEST_OCR_MAX_BAD_RATIO, INGEST_OCR_IMAGE_COVERAGE
+from utils.fast_parse import text_quality, needs_ocr, classify_pages, page_runs
+
+BAD = "\ufffd"  # undecodable glyph
+PAGE_SIZE = (600.0, 800.0)
+
+
+class FakeTextPage:
+    def __init__(self, text):
+        self.text = text
+
+    def get_text_range(self):
+        return self.text
+
+    def close(self):
+        pass
+
+
+class FakeObject:
+    def __init__(self, bounds):
+        self.bounds = bounds
+
+    def get_bounds(self):
+        return self.bounds
+
+
+class FakePage:
+    def __init__(self, text, image_share=0.0, paths=0):
+        self.text = text
+        width, height = PAGE_SIZE
+        self.images = [FakeObject((0, 0, width, height * image_share))] if image_share else []
+        self.paths = [FakeObject((0, 0, 1, 1)) for _ in range(paths)]
+
+    def get_textpage(self):
+        return FakeTextPage(self.text)
+
+    def get_objects(self, filter):
+        return self.images if filter == (pdfium_c.FPDF_PAGEOBJ_IMAGE,) else self.paths
+
+    def get_size(self):
+        return PAGE_SIZE
+
+    def close(self):
+        pass
+
+
+def classify(page, profile="text", fast=True):
+    return classify_pages([page], 1, 1, profile, fast)[0]
+
+
+def readable(n):
+    return "x" * n
+
+
+def test_text_quality_counts_readable_and_bad_characters():
+    assert text_quality("ab c\n") == (3, 0.0)
+    assert text_quality("ab" + BAD + "\ue000") == (2, 0.5)  # private-use code points are bad too
+    assert text_quality("") == (0, 0.0)
+
+
+def test_needs_ocr_min_chars_edge():
+    assert needs_ocr(INGEST_OCR_MIN_CHARS - 1, 0.0, 0.0)
+    assert not needs_ocr(INGEST_OCR_MIN_CHARS, 0.0, 0.0)
+
+
+def test_needs_ocr_bad_ratio_edge():
+    assert not needs_ocr(1000, INGEST_OCR_MAX_BAD_RATIO, 0.0)
+    assert needs_ocr(1000, INGEST_OCR_MAX_BAD_RATIO + 0.01, 0.0)
+
+
+def test_needs_ocr_scan_with_few_characters():
+    few = INGEST_FAST_MIN_CHARS - 1
+    assert needs_ocr(few, 0.0, INGEST_OCR_IMAGE_COVERAGE)
+    assert not needs_ocr(few, 0.0, INGEST_OCR_IMAGE_COVERAGE - 0.01)
+    # Enough text on top of the image: a real text layer
+    assert not needs_ocr(INGEST_FAST_MIN_CHARS, 0.0, 1.0)
+
+
+def test_classify_text_layer_page_goes_to_pdfium():
+    assert classify(FakePage(readable(INGEST_FAST_MIN_CHARS))) == "pdfium"
+
+
+def test_classify_short_text_layer_goes_to_docling():
+    page = FakePage(readable(INGEST_FAST_MIN_CHARS - 1))
+    assert INGEST_FAST_MIN_CHARS - 1 >= INGEST_OCR_MIN_CHARS
+    assert classify(page) == "docling"
+
+
+def test_classify_missing_or_broken_text_layer_goes_to_ocr():
+    assert classify(FakePage(readable(INGEST_OCR_MIN_CHARS - 1))) == "ocr"
+    broken = readable(100) + BAD * 20
+    assert text_quality(broken)[1] > INGEST_OCR_MAX_BAD_RATIO
+    assert classify(FakePage(broken)) == "ocr"
+
+
+def test_classify_scanned_page_goes_to_ocr():
+    page = FakePage(readable(INGEST_OCR_MIN_CHARS), image_share=INGEST_OCR_IMAGE_COVERAGE)
+    assert classify(page) == "ocr"
+
+
+def test_classify_without_fast_path():
+    assert classify(FakePage(readable(1000)), fast=False) == "docling"
+
+
+def test_classify_pictures_and_tables_need_docling():
+    text = readable(1000)
+    assert classify(FakePage(text, image_share=0.1), profile="full") == "docling"
+    assert classify(FakePage(text, paths=INGEST_FAST_MAX_PATHS), profile="text_tables") == "pdfium"
+    assert classify(FakePage(text, paths=INGEST_FAST_MAX_PATHS + 1), profile="text_tables") == "docling"
+
+
+def test_classify_ocr_overrides(monkeypatch):
+    monkeypatch.setitem(INGEST_PROFILES["text"], "ocr", "always")
+    assert classify(FakePage(readable(1000))) == "ocr"
+    monkeypatch.setitem(INGEST_PROFILES["text"], "ocr", "never")
+    assert classify(FakePage("")) == "docling"
+    assert classify(FakePage(readable(INGEST_OCR_MIN_CHARS - 1), image_share=1.0)) == "docling"
+
+
+def test_page_runs_groups_consecutive_modes():
+    modes = ["pdfium", "pdfium", "ocr", "docling", "docling", "pdfium"]
+    assert page_runs(modes, 9) == [
+        ("pdfium", 9, 10),
+        ("ocr", 11, 11),
+        ("docling", 12, 13),
+        ("pdfium", 14, 14),
+    ]
+
+
+def test_page_runs_single_and_empty():
+    assert page_runs(["ocr"], 1) == [("ocr", 1, 1)]
+    assert page_runs([], 1) == []
@@ -0,0 +1,120 @@
+"""
+Embedding precision benchmark
+
+Compares the fp32 and int8 exports of EMB_MODEL on the PDFs in test_file/:
+1. Query latency (single query, p50 / p95)
+2. Ingestion throughput (chunks per second, batched)
+3. recall@k of the int8 model against the fp32 ranking over the same corpus
+
+Chunks are taken from the PDF text layer (pypdfium2), queries are the first
+words of randomly sampled chunks.
+
+Run from src/core (needs the core requirements installed):
+python -m utils.bench_embedding --corpus ../../test_file
+"""
+
+import argparse
+import logging
+import random
+import statistics
+import time
+from pathlib import Path
+
+import numpy as np
+import pypdfium2 as pdfium
+
+from cfg.emb_settings import EMB_MODEL, INGEST_EMB_BATCH_SIZE
+from .model_registry import get_text_model
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("bench-embedding")
+
+
+def load_chunks(corpus: Path, max_chunks: int) -> list:
+    """Split the text layer of every PDF under `corpus` into paragraph-sized chunks."""
+    chunks = []
+    for pdf_path in sorted(corpus.rglob("*.pdf")):
+        pdf = pdfium.PdfDocument(str(pdf_path))
+        try:
+            for page in pdf:
+                text = page.get_textpage().get_text_range()
+                for para in text.split("\n\n"):
+                    para = " ".join(para.split())
+                    if len(para) >= 40:
+                        chunks.append(para[:1000])
+        finally:
+            pdf.close()
+        if len(chunks) >= max_chunks:
+            break
+    return chunks[:max_chunks]
+
+
+def embed_matrix(model, texts: list) -> np.ndarray:
+    return np.array(list(model.embed(texts, batch_size=INGEST_EMB_BATCH_SIZE)), dtype=np.float32)
+
+
+def bench_precision(precision: str, chunks: list, queries: list) -> dict:
+    t0 = time.perf_counter()
+    model = get_text_model(EMB_MODEL, precision)
+    load_s = time.perf_counter() - t0
+
+    latencies = []
+    for q in queries:
+        t0 = time.perf_counter()
+        list(model.embed([q]))
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+    t0 = time.perf_counter()
+    doc_emb = embed_matrix(model, chunks)
+    ingest_s = time.perf_counter() - t0
+
+    return {
+        "precision": precision,
+        "load_s": load_s,
+        "query_p50_ms": statistics.median(latencies),
+        "query_p95_ms": float(np.percentile(latencies, 95)),
+        "chunks_per_s": len(chunks) / ingest_s,
+        "doc_emb": doc_emb,
+        "query_emb": embed_matrix(model, queries),
+    }
+
+
+def recall_at_k(ref_query, ref_docs, cand_query, cand_docs, k: int) -> float:
+    """Fraction of the fp32 top-k that the candidate model also ranks in its top-k."""
+    ref_top = np.argsort(-(ref_query @ ref_docs.T), axis=1)[:, :k]
+    cand_top = np.argsort(-(cand_query @ cand_docs.T), axis=1)[:, :k]
+    hits = [len(set(r) & set(c)) / k for r, c in zip(ref_top, cand_top)]
+    return float(np.mean(hits))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default="../../test_file", help="directory with PDFs")
+    parser.add_argument("--max-chunks", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 5, 10])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    chunks = load_chunks(Path(args.corpus), args.max_chunks)
+    if not chunks:
+        raise SystemExit(f"No text chunks found under {args.corpus}")
+    rng = random.Random(args.seed)
+    queries = ["query: " + " ".join(c.split()[:12]) for c in rng.sample(chunks, min(args.queries, len(chunks)))]
+    chunks = ["passage: " + c for c in chunks]
+    logger.info(f"{len(chunks)} chunks, {len(queries)} queries")
+
+    fp32 = bench_precision("fp32", chunks, queries)
+    int8 = bench_precision("int8", chunks, queries)
+
+    print(f"\n{'precision':<10}{'load s':>10}{'q p50 ms':>12}{'q p95 ms':>12}{'chunks/s':>12}")
+    for r in (fp32, int8):
+        print(f"{r['precision']:<10}{r['load_s']:>10.2f}{r['query_p50_ms']:>12.2f}{r['query_p95_ms']:>12.2f}{r['chunks_per_s']:>12.1f}")
+    print()
+    for k in args.k:
+        r = recall_at_k(fp32["query_emb"], fp32["doc_emb"], int8["query_emb"], int8["doc_emb"], k)
+        print(f"int8 recall@{k} vs fp32: {r:.4f}")
+
+
+if __name__ == "__main__":
+    main()
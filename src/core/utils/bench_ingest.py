@@ -0,0 +1,129 @@
+"""
+Ingestion upload benchmark
+
+Compares Qdrant upload settings on the PDFs in test_file/:
+1. Upload only: the documents are parsed and embedded once, then the same
+   points are written to fresh collections with every configuration.
+2. End to end (--end-to-end): stream_ingest per configuration, after one
+   warm-up run so that every configuration sees the same embedding disk cache.
+
+A configuration is "batch:parallel:wait|nowait[:bulk]"; batch 0 sends each
+window's points of a collection in one request (the old behaviour), "bulk"
+loads into collections with indexing off and includes the index build in the
+total time.
+
+Run from src/core (needs the core requirements and a running Qdrant):
+python -m utils.bench_ingest --corpus ../../test_file --max-files 5
+"""
+
+import argparse
+import logging
+import os
+import time
+from pathlib import Path
+
+from qdrant_client import QdrantClient
+
+from cfg.ingest_settings import DEFAULT_INGEST_PROFILE, INGEST_PAGE_WINDOW
+from .ingest_pipeline import stream_ingest
+from .parse import iter_page_windows
+from .qdrant_store import QdrantVecStore, configure_upserts
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("bench-ingest")
+
+DEFAULT_CONFIGS = ["0:1:wait", "256:1:wait", "256:1:nowait", "256:4:nowait", "256:4:nowait:bulk"]
+
+
+def parse_config(config: str) -> dict:
+    batch, parallel, wait, *bulk = config.split(":")
+    return {"name": config, "batch": int(batch), "parallel": int(parallel), "wait": wait == "wait", "bulk": bulk == ["bulk"]}
+
+
+def bench_collections(tag: str) -> dict:
+    """A previous-entry dict that makes QdrantVecStore use bench_<tag>_* collections"""
+    return {f"{kind}_table_name": f"bench_{tag}_{kind}" for kind in ("texts", "images", "tables")}
+
+
+def drop_collections(tag: str):
+    client = QdrantClient(host=os.getenv("QDRANT_HOST", "qdrant"), port=int(os.getenv("QDRANT_PORT", "6333")))
+    for name in bench_collections(tag).values():
+        client.delete_collection(collection_name=name)
+
+
+def embed_corpus(files: list, profile: str, window: int) -> list:
+    """[(collection kind, points)] of every window of every file"""
+    batches = []
+    for path in files:
+        store = QdrantVecStore("bench", path.name, bench_collections("source"), profile, bulk=False)
+        try:
+            for data, meta_data, _ in iter_page_windows(str(path), window, profile):
+                batches.append(("texts", store.text_points(data)))
+                batches.append(("images", store.image_points(data)))
+                batches.append(("tables", store.table_points(meta_data)))
+        finally:
+            drop_collections("source")
+    return batches
+
+
+def bench_upload(batches: list, config: dict, profile: str) -> dict:
+    configure_upserts(batch_size=config["batch"], parallel=config["parallel"], wait=config["wait"])
+    store = QdrantVecStore("bench", "bench", bench_collections("upload"), profile, bulk=config["bulk"])
+    names = {"texts": store.texts_collection_name, "images": store.images_collection_name, "tables": store.tables_collection_name}
+    points = sum(len(p) for _, p in batches)
+    try:
+        t0 = time.perf_counter()
+        for kind, window_points in batches:
+            store.upsert_points(names[kind], window_points)
+        sent_s = time.perf_counter() - t0
+        store.flush()
+        store.build_indexes()
+        total_s = time.perf_counter() - t0
+    finally:
+        drop_collections("upload")
+    return {"config": config["name"], "points": points, "sent_s": sent_s, "total_s": total_s, "points_per_s": points / total_s}
+
+
+def bench_end_to_end(files: list, config: dict, profile: str, window: int) -> dict:
+    configure_upserts(batch_size=config["batch"], parallel=config["parallel"], wait=config["wait"])
+    t0 = time.perf_counter()
+    for path in files:
+        try:
+            stream_ingest("bench", path.name, str(path), window=window, profile=profile, previous=bench_collections("e2e"), bulk=config["bulk"])
+        finally:
+            drop_collections("e2e")
+    return {"config": config["name"], "seconds": time.perf_counter() - t0}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default="../../test_file", help="directory with PDFs")
+    parser.add_argument("--max-files", type=int, default=5)
+    parser.add_argument("--profile", default=DEFAULT_INGEST_PROFILE)
+    parser.add_argument("--window", type=int, default=INGEST_PAGE_WINDOW)
+    parser.add_argument("--configs", nargs="+", default=DEFAULT_CONFIGS)
+    parser.add_argument("--end-to-end", action="store_true")
+    args = parser.parse_args()
+
+    files = sorted(Path(args.corpus).rglob("*.pdf"))[:args.max_files]
+    if not files:
+        raise SystemExit(f"No PDFs found under {args.corpus}")
+    configs = [parse_config(c) for c in args.configs]
+
+    logger.info(f"Parsing and embedding {len(files)} files")
+    batches = embed_corpus(files, args.profile, args.window)
+    results = [bench_upload(batches, config, args.profile) for config in configs]
+    print(f"\n{'config':<16}{'points':>10}{'sent s':>10}{'total s':>10}{'points/s':>12}")
+    for r in results:
+        print(f"{r['config']:<16}{r['points']:>10}{r['sent_s']:>10.2f}{r['total_s']:>10.2f}{r['points_per_s']:>12.1f}")
+
+    if args.end_to_end:
+        bench_end_to_end(files, configs[-1], args.profile, args.window)  # warm-up
+        results = [bench_end_to_end(files, config, args.profile, args.window) for config in configs]
+        print(f"\n{'config':<16}{'end-to-end s':>14}")
+        for r in results:
+            print(f"{r['config']:<16}{r['seconds']:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""
+Global CPU budget
+
+docling, the ingestion ONNX sessions and the query ONNX sessions used to size
+their thread pools independently (docling alone took all cores but one),
+oversubscribing the box and causing search latency spikes during ingestion.
+Every component that creates a model session asks `threads_for(role)` for
+its share of CPU_TOTAL_CORES instead.
+"""
+
+import logging
+import math
+
+from cfg.cpu_settings import CPU_TOTAL_CORES, CPU_SHARES
+
+ROLES = tuple(CPU_SHARES)
+
+_total_cores = CPU_TOTAL_CORES
+
+
+def set_total_cores(cores: int):
+    """Shrink the budget of this process, e.g. to its slice of the box in an ingest worker process."""
+    global _total_cores
+    _total_cores = max(1, cores)
+    logging.info(f"CPU budget: {budget()}")
+
+
+def threads_for(role: str) -> int:
+    """Number of threads the given role may use (at least one)."""
+    if role not in CPU_SHARES:
+        raise ValueError(f"Unknown CPU budget role: {role}")
+    return max(1, math.floor(_total_cores * CPU_SHARES[role]))
+
+
+def budget() -> dict:
+    plan = {role: threads_for(role) for role in ROLES}
+    plan["request_handling"] = max(0, _total_cores - sum(plan.values()))
+    plan["total"] = _total_cores
+    return plan
+
+
+logging.info(f"CPU budget: {budget()}")
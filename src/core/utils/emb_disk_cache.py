@@ -0,0 +1,133 @@
+"""
+Persistent content-addressed embedding cache for ingestion
+
+Re-ingesting a file, or ingesting documents that share boilerplate, would
+otherwise re-embed identical text. Vectors are stored per model in two
+append-only files under INGEST_EMB_CACHE_DIR:
+
+- `<model>.f32`:  float32 rows, read through a numpy memmap
+- `<model>.keys`: 32-byte sha256(model name + text) digests, row i <-> key i
+
+Writers take an exclusive flock on the key file, so several workers (threads
+or processes) can share one cache directory.
+"""
+
+import fcntl
+import hashlib
+import logging
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from cfg.emb_settings import INGEST_EMB_CACHE_DIR
+
+KEY_SIZE = 32
+
+
+class EmbeddingDiskCache:
+    def __init__(self, model_name: str, dim: int, root: str = INGEST_EMB_CACHE_DIR):
+        self.model_name = model_name
+        self.dim = dim
+        Path(root).mkdir(parents=True, exist_ok=True)
+        safe_name = re.sub(r"[^A-Za-z0-9_.-]", "_", model_name)
+        self.vec_path = Path(root) / f"{safe_name}.f32"
+        self.key_path = Path(root) / f"{safe_name}.keys"
+        self.vec_path.touch(exist_ok=True)
+        self.key_path.touch(exist_ok=True)
+        self._index: Dict[bytes, int] = {}
+        self._rows = 0
+        self._mmap = None
+        self._lock = threading.Lock()
+        with self._lock:
+            self._refresh()
+
+    def key(self, text: str) -> bytes:
+        return hashlib.sha256(f"{self.model_name}\n{text}".encode("utf-8")).digest()
+
+    def _refresh(self):
+        """Pick up rows appended by other writers since the last read."""
+        size = self.key_path.stat().st_size
+        rows = size // KEY_SIZE
+        if rows <= self._rows:
+            return
+        with open(self.key_path, "rb") as f:
+            f.seek(self._rows * KEY_SIZE)
+            data = f.read((rows - self._rows) * KEY_SIZE)
+        for i in range(rows - self._rows):
+            self._index.setdefault(data[i * KEY_SIZE:(i + 1) * KEY_SIZE], self._rows + i)
+        self._rows = rows
+        self._mmap = None
+
+    def _vectors(self) -> np.ndarray:
+        if self._mmap is None and self._rows:
+            self._mmap = np.memmap(self.vec_path, dtype=np.float32, mode="r", shape=(self._rows, self.dim))
+        return self._mmap
+
+    def get_many(self, keys: List[bytes]) -> List[Optional[np.ndarray]]:
+        with self._lock:
+            if any(k not in self._index for k in keys):
+                self._refresh()
+            vectors = self._vectors()
+            return [np.array(vectors[self._index[k]]) if k in self._index else None for k in keys]
+
+    def put_many(self, keys: List[bytes], vectors: List[np.ndarray]):
+        with self._lock, open(self.key_path, "ab") as key_file:
+            fcntl.flock(key_file, fcntl.LOCK_EX)
+            try:
+                self._refresh()
+                new = {}
+                for k, v in zip(keys, vectors):
+                    if k not in self._index and k not in new:
+                        new[k] = np.asarray(v, dtype=np.float32).reshape(self.dim)
+                if not new:
+                    return
+                with open(self.vec_path, "r+b") as vec_file:
+                    # Drop vectors left behind by a writer that died before writing its keys
+                    vec_file.truncate(self._rows * self.dim * 4)
+                    vec_file.seek(0, os.SEEK_END)
+                    vec_file.write(np.stack(list(new.values())).tobytes())
+                    vec_file.flush()
+                    os.fsync(vec_file.fileno())
+                key_file.write(b"".join(new.keys()))
+                key_file.flush()
+                for i, k in enumerate(new):
+                    self._index[k] = self._rows + i
+                self._rows += len(new)
+                self._mmap = None
+            finally:
+                fcntl.flock(key_file, fcntl.LOCK_UN)
+
+    def embed(self, texts: List[str], embed_fn: Callable[[List[str]], List[np.ndarray]]) -> List[np.ndarray]:
+        """Return vectors for `texts`, calling `embed_fn` only on cache misses."""
+        keys = [self.key(t) for t in texts]
+        vectors = self.get_many(keys)
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        if missing:
+            # Repeated texts within one document are embedded once
+            first = {}
+            for i in missing:
+                first.setdefault(keys[i], i)
+            computed = dict(zip(first, embed_fn([texts[i] for i in first.values()])))
+            self.put_many(list(computed), list(computed.values()))
+            for i in missing:
+                vectors[i] = computed[keys[i]]
+        logging.info(f"Embedding cache {self.model_name}: {len(texts) - len(missing)} hits, {len(missing)} misses")
+        return vectors
+
+
+_caches: Dict[str, EmbeddingDiskCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_disk_cache(model_name: str, dim: int) -> EmbeddingDiskCache:
+    """Return the shared disk cache for `model_name`."""
+    with _caches_lock:
+        cache = _caches.get(model_name)
+        if cache is None:
+            cache = EmbeddingDiskCache(model_name, dim)
+            _caches[model_name] = cache
+    return cache
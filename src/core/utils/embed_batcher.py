@@ -0,0 +1,105 @@
+"""
+Dynamic micro-batching of query embeddings
+
+Concurrent /search requests would otherwise each run a batch-of-one `embed()`.
+An `EmbeddingBatcher` collects pending query texts for up to
+EMB_BATCH_MAX_WAIT_MS or EMB_BATCH_MAX_SIZE items, runs one batched model call
+in a worker thread, and resolves every waiting request with its own vector.
+"""
+
+import asyncio
+import logging
+import threading
+from typing import Dict, List
+
+from cfg.emb_settings import EMB_BATCH_MAX_SIZE, EMB_BATCH_MAX_WAIT_MS
+from .model_registry import get_text_model
+
+
+class EmbeddingBatcher:
+    def __init__(self, model_name: str, max_batch_size: int = EMB_BATCH_MAX_SIZE, max_wait_ms: float = EMB_BATCH_MAX_WAIT_MS):
+        self.model_name = model_name
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        self.batches = 0
+        self.items = 0
+        self._queue = None
+        self._worker = None
+        self._loop = None
+
+    def _ensure_worker(self):
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    async def embed(self, text: str) -> list:
+        """Queue `text` for the next batch and wait for its vector."""
+        self._ensure_worker()
+        fut = self._loop.create_future()
+        await self._queue.put((text, fut))
+        return await fut
+
+    def _embed_batch(self, texts: List[str]) -> List[list]:
+        embeds = get_text_model(self.model_name).embed(texts)
+        return [e.tolist() if hasattr(e, 'tolist') else e for e in embeds]
+
+    async def _collect(self) -> list:
+        batch = [await self._queue.get()]
+        deadline = self._loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - self._loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            # Identical queries in the same window share one model input
+            unique_texts = list(dict.fromkeys(text for text, _ in batch))
+            try:
+                vectors = await self._loop.run_in_executor(None, self._embed_batch, unique_texts)
+            except Exception as e:
+                logging.error(f"Batched embedding failed for {self.model_name}: {e}")
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+            by_text = dict(zip(unique_texts, vectors))
+            for text, fut in batch:
+                if not fut.done():
+                    fut.set_result(by_text[text])
+            self.batches += 1
+            self.items += len(batch)
+
+    def stats(self) -> dict:
+        return {
+            "model": self.model_name,
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": self.items / self.batches if self.batches else 0.0,
+        }
+
+
+_batchers: Dict[str, EmbeddingBatcher] = {}
+_lock = threading.Lock()
+
+
+def get_batcher(model_name: str) -> EmbeddingBatcher:
+    """Return the shared batcher for `model_name`."""
+    with _lock:
+        batcher = _batchers.get(model_name)
+        if batcher is None:
+            batcher = EmbeddingBatcher(model_name)
+            _batchers[model_name] = batcher
+    return batcher
+
+
+def batcher_stats() -> list:
+    return [b.stats() for b in _batchers.values()]
@@ -11,15 +11,19 @@ spatial location within a page, using a 4-dimensional vector [x1, y1, x2, y2]
 that represents the bounding box coordinates.
 """
 
-from fastembed import TextEmbedding
 from cfg.emb_settings import EMB_MODEL, EMB_SEARCH_METRIC
+from .query_cache import embed_query
 
-def add_emb_cond(condition: dict) -> dict:
+def add_emb_cond(condition: dict, query_vector: list = None) -> dict:
     """
     Add embedding condition to the existing condition.
+
+    If `query_vector` is given (e.g. already embedded by the micro-batcher)
+    it is used as-is instead of embedding the query text again.
     """
-    embedding_model = TextEmbedding(model_name=EMB_MODEL)
-    embeddings_list = list(embedding_model.embed(condition["text"][0]['query']))
+    if query_vector is None:
+        query_vector = embed_query(EMB_MODEL, condition["text"][0]['query'])
+    embeddings_list = [query_vector]
     
     # Add embedding to the condition
     if 'dense' not in condition:
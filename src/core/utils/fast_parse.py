@@ -0,0 +1,197 @@
+"""
+Per-page parser selection and the text-layer fast path for PDFs
+
+Most uploaded PDFs (course outlines, regulations, ...) carry a clean text
+layer, for which docling's layout / OCR models add a lot of time but little
+text. `classify_pages` probes every page with pypdfium2 and picks one of
+
+- "pdfium": the text layer has at least INGEST_FAST_MIN_CHARS readable
+  characters, there are no pictures (if the profile indexes pictures) and at
+  most INGEST_FAST_MAX_PATHS drawn paths / table rulings (if it indexes
+  tables). `fast_page_items` turns the page into docling-like text items.
+- "ocr": the text layer is missing or broken (too few readable characters,
+  too many undecodable ones) or the page is a scan; docling with OCR.
+- "docling": everything else; docling layout pipeline without OCR.
+
+The profile's "ocr" setting ("auto" / "always" / "never") overrides the OCR
+decision.
+"""
+
+import statistics
+from typing import List
+
+import pypdfium2.raw as pdfium_c
+# pdfium is not thread safe: share docling's lock, which its pypdfium2 backend
+# and docling-parse hold around their own pdfium calls
+from docling.utils.locks import pypdfium2_lock as pdfium_lock
+
+from cfg.ingest_settings import INGEST_PROFILES, INGEST_FAST_MIN_CHARS, INGEST_FAST_MAX_PATHS
+from cfg.ingest_settings import INGEST_OCR_MIN_CHARS, INGEST_OCR_MAX_BAD_RATIO, INGEST_OCR_IMAGE_COVERAGE
+
+# A segment joins a line when it overlaps it vertically by this share of its height
+LINE_OVERLAP = 0.5
+# ... and starts less than this many line heights right of it (keeps columns apart)
+LINE_MAX_GAP = 3.0
+# Lines closer than this many line heights belong to the same paragraph
+PARAGRAPH_GAP = 0.8
+
+
+def _is_bad(ch: str) -> bool:
+    """Characters of a broken text layer: undecodable glyphs and private-use code points"""
+    return ch == "\ufffd" or "\ue000" <= ch <= "\uf8ff"
+
+
+def text_quality(text: str):
+    """(readable characters, share of bad characters) of a page's text layer"""
+    readable = bad = 0
+    for ch in text:
+        if _is_bad(ch):
+            bad += 1
+        elif ch.isprintable() and not ch.isspace():
+            readable += 1
+    return readable, (bad / (readable + bad) if readable + bad else 0.0)
+
+
+def _image_coverage(page, images: list) -> float:
+    width, height = page.get_size()
+    area = 0.0
+    for obj in images:
+        # get_pos() was renamed get_bounds() in pypdfium2 5
+        left, bottom, right, top = obj.get_bounds() if hasattr(obj, "get_bounds") else obj.get_pos()
+        area += max(right - left, 0) * max(top - bottom, 0)
+    return min(area / (width * height), 1.0) if width and height else 0.0
+
+
+def needs_ocr(readable: int, bad_ratio: float, image_coverage: float) -> bool:
+    if readable < INGEST_OCR_MIN_CHARS or bad_ratio > INGEST_OCR_MAX_BAD_RATIO:
+        return True
+    # A scan with a few stray characters (page numbers, stamps)
+    return image_coverage >= INGEST_OCR_IMAGE_COVERAGE and readable < INGEST_FAST_MIN_CHARS
+
+
+def classify_pages(pdf, start: int, end: int, profile: str, fast: bool = True) -> List[str]:
+    """Parser ("pdfium" / "docling" / "ocr") for pages start..end (1-based, inclusive)"""
+    options = INGEST_PROFILES[profile]
+    modes = []
+    for page_no in range(start, end + 1):
+        page = pdf[page_no - 1]
+        try:
+            textpage = page.get_textpage()
+            try:
+                readable, bad_ratio = text_quality(textpage.get_text_range())
+            finally:
+                textpage.close()
+            images = list(page.get_objects(filter=(pdfium_c.FPDF_PAGEOBJ_IMAGE,)))
+            if options["ocr"] == "always":
+                ocr = True
+            elif options["ocr"] == "never":
+                ocr = False
+            else:
+                ocr = needs_ocr(readable, bad_ratio, _image_coverage(page, images))
+
+            usable = fast and not ocr and readable >= INGEST_FAST_MIN_CHARS and bad_ratio <= INGEST_OCR_MAX_BAD_RATIO
+            if usable and options["pictures"]:
+                usable = not images
+            if usable and options["tables"]:
+                paths = sum(1 for _ in page.get_objects(filter=(pdfium_c.FPDF_PAGEOBJ_PATH,)))
+                usable = paths <= INGEST_FAST_MAX_PATHS
+        finally:
+            page.close()
+        modes.append("pdfium" if usable else "ocr" if ocr else "docling")
+    return modes
+
+
+def page_runs(modes: List[str], start: int) -> List[tuple]:
+    """Split a window into runs of consecutive pages with the same parser: [(mode, first, last)]"""
+    runs = []
+    for offset, mode in enumerate(modes):
+        page = start + offset
+        if runs and runs[-1][0] == mode:
+            runs[-1][2] = page
+        else:
+            runs.append([mode, page, page])
+    return [tuple(run) for run in runs]
+
+
+def _lines(segments: list) -> list:
+    """Group text segments (left, bottom, right, top, text) into lines"""
+    lines = []
+    for seg in sorted(segments, key=lambda s: (-s[3], s[0])):
+        left, bottom, right, top, text = seg
+        height = max(top - bottom, 1e-3)
+        for line in lines:
+            overlap = min(top, line["t"]) - max(bottom, line["b"])
+            if overlap >= LINE_OVERLAP * height and left - line["r"] <= LINE_MAX_GAP * height and right >= line["l"]:
+                line["parts"].append(seg)
+                line.update(l=min(line["l"], left), b=min(line["b"], bottom), r=max(line["r"], right), t=max(line["t"], top))
+                break
+        else:
+            lines.append({"l": left, "b": bottom, "r": right, "t": top, "parts": [seg]})
+    for line in lines:
+        line["text"] = " ".join(p[4] for p in sorted(line["parts"], key=lambda p: p[0]))
+    return lines
+
+
+def _paragraphs(lines: list) -> list:
+    """Group lines into paragraphs: each line continues the paragraph just above it in the same column"""
+    if not lines:
+        return []
+    height = statistics.median(line["t"] - line["b"] for line in lines)
+    paragraphs = []
+    for line in sorted(lines, key=lambda ln: (-ln["t"], ln["l"])):
+        for para in reversed(paragraphs):
+            last = para[-1]
+            gap = last["b"] - line["t"]
+            if -LINE_OVERLAP * height <= gap <= PARAGRAPH_GAP * height and line["l"] < last["r"] and line["r"] > last["l"]:
+                para.append(line)
+                break
+        else:
+            paragraphs.append([line])
+    return paragraphs
+
+
+def fast_page_items(pdf, page_no: int) -> List[dict]:
+    """Text items of one page in the shape of docling's export_to_dict()["texts"]"""
+    page = pdf[page_no - 1]
+    textpage = page.get_textpage()
+    try:
+        segments = []
+        for i in range(textpage.count_rects()):
+            left, bottom, right, top = textpage.get_rect(i)
+            text = " ".join(textpage.get_text_bounded(left, bottom, right, top).split())
+            if text:
+                segments.append((left, bottom, right, top, text))
+    finally:
+        textpage.close()
+        page.close()
+
+    items = []
+    for idx, para in enumerate(_paragraphs(_lines(segments))):
+        text = " ".join(line["text"] for line in para)
+        items.append({
+            "self_ref": f"#/pdfium/{page_no}/{idx}",
+            "parent": {"$ref": "#/body"},
+            "content_layer": "body",
+            "label": "text",
+            "prov": [{
+                "page_no": page_no,
+                "bbox": {
+                    "l": min(line["l"] for line in para),
+                    "t": max(line["t"] for line in para),
+                    "r": max(line["r"] for line in para),
+                    "b": min(line["b"] for line in para),
+                    "coord_origin": "BOTTOMLEFT",
+                },
+            }],
+            "orig": text,
+            "text": text,
+        })
+    return items
+
+
+def fast_convert_pages(pdf, start: int, end: int) -> dict:
+    """Converted data for pages start..end, with the keys QdrantVecStore reads"""
+    texts = []
+    for page_no in range(start, end + 1):
+        texts.extend(fast_page_items(pdf, page_no))
+    return {"texts": texts, "pictures": [], "parser": "pdfium"}
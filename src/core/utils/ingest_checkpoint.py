@@ -0,0 +1,120 @@
+"""
+Page-window checkpoints of streaming ingestion
+
+A restart of the core service used to lose every file of a running job,
+while the collections it had half filled stayed behind in Qdrant. While a
+file is streamed, its checkpoint records after every uploaded page window:
+
+- on the job document, files.{i}.checkpoint:
+  {"etag", "collections", "pages_done", "changes", "parsed"}
+- in INGEST_CHECKPOINT_COLLECTION, one document per window with the point ids
+  the window produced, so the final prune keeps the points of the windows
+  that are not parsed again, and the occurrences of every content key, so the
+  point ids of repeated chunks continue where they stopped
+
+A resumed file continues in the same collections after page pages_done. The
+checkpoint only counts if the object still has the same ETag, and it is
+removed once the file is done (or has failed).
+"""
+
+import datetime
+from collections import Counter
+from typing import Optional
+
+import pymongo
+
+from cfg.ingest_settings import INGEST_JOBS_COLLECTION, INGEST_CHECKPOINT_COLLECTION
+
+
+class IngestCheckpoints:
+    def __init__(self, db):
+        self.jobs = db[INGEST_JOBS_COLLECTION]
+        self.windows = db[INGEST_CHECKPOINT_COLLECTION]
+        self.windows.create_index([("job_id", pymongo.ASCENDING), ("index", pymongo.ASCENDING)])
+
+    def file(self, job_id: str, index: int, etag: str = "") -> "FileCheckpoint":
+        return FileCheckpoint(self, job_id, index, etag)
+
+    def clear(self, job_id: str, index: int):
+        self.jobs.update_one({"job_id": job_id}, {"$unset": {f"files.{index}.checkpoint": ""}})
+        self.windows.delete_many({"job_id": job_id, "index": index})
+
+
+class FileCheckpoint:
+    """Checkpoint of file `index` of job `job_id`, handed to `stream_ingest`"""
+
+    def __init__(self, checkpoints: IngestCheckpoints, job_id: str, index: int, etag: str = ""):
+        self.checkpoints = checkpoints
+        self.job_id = job_id
+        self.index = index
+        self.etag = etag
+        self._prefix = f"files.{index}.checkpoint"
+
+    def _file_checkpoint(self) -> Optional[dict]:
+        job = self.checkpoints.jobs.find_one({"job_id": self.job_id}, {"files.checkpoint": 1})
+        files = (job or {}).get("files", [])
+        checkpoint = files[self.index].get("checkpoint") if self.index < len(files) else None
+        if not checkpoint or checkpoint.get("etag") != self.etag:
+            return None
+        return checkpoint
+
+    def pages_done(self) -> int:
+        """Pages an interrupted ingest of the same object has uploaded (0 if there is none)"""
+        checkpoint = self._file_checkpoint()
+        return checkpoint["pages_done"] if checkpoint else 0
+
+    def load(self) -> Optional[dict]:
+        """
+        The checkpoint of an interrupted ingest of the same object, with its
+        kept point ids and content-key occurrences, or None
+        """
+        checkpoint = self._file_checkpoint()
+        if checkpoint is None:
+            return None
+        kept_ids, ordinals = {}, Counter()
+        for window in self.checkpoints.windows.find({"job_id": self.job_id, "index": self.index}, {"ids": 1, "ordinals": 1}):
+            for collection_name, ids in window["ids"].items():
+                kept_ids.setdefault(collection_name, []).extend(ids)
+            ordinals.update(window.get("ordinals", {}))
+        checkpoint["kept_ids"] = kept_ids
+        checkpoint["ordinals"] = ordinals
+        return checkpoint
+
+    def start(self, collections: dict):
+        """Record the collections of a new ingest (an earlier checkpoint of the file is dropped)"""
+        self.checkpoints.windows.delete_many({"job_id": self.job_id, "index": self.index})
+        self.checkpoints.jobs.update_one({"job_id": self.job_id}, {"$set": {self._prefix: {
+            "etag": self.etag,
+            "collections": collections,
+            "pages_done": 0,
+            "changes": {},
+            "parsed": {},
+        }}})
+
+    def window_done(self, pages: tuple, window_state: dict, changes: dict, parsed: dict):
+        """Record a window whose points Qdrant has acknowledged (`window_state`: QdrantVecStore.take_window_state())"""
+        self.checkpoints.windows.insert_one({
+            "job_id": self.job_id,
+            "index": self.index,
+            "pages": list(pages),
+            "ids": window_state["ids"],
+            "ordinals": window_state["ordinals"],
+            "created_at": datetime.datetime.utcnow(),
+        })
+        self.checkpoints.jobs.update_one({"job_id": self.job_id}, {"$set": {
+            f"{self._prefix}.pages_done": pages[1],
+            f"{self._prefix}.changes": changes,
+            f"{self._prefix}.parsed": parsed,
+        }})
+
+
+_checkpoints = {}
+
+
+def get_checkpoints(db) -> IngestCheckpoints:
+    """Shared checkpoint store for a pymongo database (indexes are created once per process)"""
+    checkpoints = _checkpoints.get(db.name)
+    if checkpoints is None:
+        checkpoints = IngestCheckpoints(db)
+        _checkpoints[db.name] = checkpoints
+    return checkpoints
@@ -0,0 +1,196 @@
+"""
+Asynchronous ingestion job queue
+
+/process_file used to parse, embed and upsert every file inside the HTTP
+request. `IngestJobs` instead records a job document in MongoDB, hands the job
+id to a pool of worker threads and returns immediately. Workers call the
+handler with a `FileProgress` per file, which records the current stage,
+per-stage timings and errors on the job document for the /jobs endpoints.
+
+Jobs still queued or running when the service stopped are re-queued by
+`start()` (INGEST_RESUME_JOBS): their finished files are skipped and streamed
+files continue from their page-window checkpoint.
+
+Job document:
+{
+    "job_id": "...",
+    "kb_name": "...",
+    "kb_owner": "...",
+    "status": "queued" | "running" | "success" | "error",
+    "created_at": ..., "started_at": ..., "resumed_at": ..., "finished_at": ...,
+    "files": [
+        {"file_name": "...", "kb_name": "...", "stage": "queued", "status": "queued",
+         "timings": {"downloading": 0.4, "parsing": 12.1, ...}, "error": None},
+        ...
+    ]
+}
+"""
+
+import datetime
+import logging
+import queue
+import threading
+import time
+import traceback
+import uuid
+from typing import Callable, List
+
+from cfg.ingest_settings import INGEST_WORKERS, INGEST_RESUME_JOBS
+
+
+class FileProgress:
+    """Tracks one file of a job; each `stage()` call closes the timing of the previous stage."""
+
+    def __init__(self, collection, job_id: str, index: int):
+        self.collection = collection
+        self.job_id = job_id
+        self.index = index
+        self._stage = None
+        self._stage_started = None
+        self._started = time.perf_counter()
+
+    def _set(self, fields: dict):
+        prefix = f"files.{self.index}."
+        self.collection.update_one(
+            {"job_id": self.job_id},
+            {"$set": {prefix + k: v for k, v in fields.items()}}
+        )
+
+    def _close_stage(self) -> dict:
+        if self._stage is None:
+            return {}
+        return {f"timings.{self._stage}": round(time.perf_counter() - self._stage_started, 3)}
+
+    def stage(self, name: str, **extra):
+        fields = self._close_stage()
+        self._stage = name
+        self._stage_started = time.perf_counter()
+        fields.update({"stage": name, "status": "running"}, **extra)
+        self._set(fields)
+        logging.info(f"[job {self.job_id}] file {self.index}: {name}")
+
+    def update(self, **fields):
+        """Record extra per-file fields (e.g. pages_done) without changing stage"""
+        self._set(fields)
+
+    def done(self, status: str = "success", **extra):
+        fields = self._close_stage()
+        self._stage = None
+        fields.update({
+            "stage": "done",
+            "status": status,
+            "timings.total": round(time.perf_counter() - self._started, 3),
+        }, **extra)
+        self._set(fields)
+
+    def fail(self, error: str):
+        fields = self._close_stage()
+        fields.update({
+            "status": "error",
+            "error": error,
+            "timings.total": round(time.perf_counter() - self._started, 3),
+        })
+        self._set(fields)
+        logging.error(f"[job {self.job_id}] file {self.index} failed at {self._stage}: {error}")
+
+
+class IngestJobs:
+    def __init__(self, collection, handler: Callable[[str, dict, "IngestJobs"], None], workers: int = INGEST_WORKERS):
+        """
+        collection: pymongo collection storing job documents
+        handler: handler(job_id, task_queue, jobs) processes one job, using jobs.progress()
+        """
+        self.collection = collection
+        self.handler = handler
+        self.workers = workers
+        self._queue: "queue.Queue[str]" = queue.Queue()
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self.collection.create_index("job_id", unique=True)
+
+    def start(self, resume: bool = INGEST_RESUME_JOBS):
+        with self._lock:
+            if self._threads:
+                return
+            if resume:
+                self._requeue_unfinished()
+            for i in range(self.workers):
+                t = threading.Thread(target=self._worker, name=f"ingest-worker-{i}", daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def _requeue_unfinished(self):
+        """Queue the jobs an earlier run of the service did not finish, oldest first"""
+        cursor = self.collection.find({"status": {"$in": ["queued", "running"]}}, {"job_id": 1}).sort("created_at", 1)
+        for job in cursor:
+            logging.info(f"[job {job['job_id']}] re-queued after restart")
+            self._queue.put(job["job_id"])
+
+    def submit(self, task_queue: dict) -> str:
+        job_id = uuid.uuid4().hex
+        self.collection.insert_one({
+            "job_id": job_id,
+            "kb_name": task_queue.get("kb_name", ""),
+            "kb_owner": task_queue.get("kb_owner", ""),
+            "ingest_profile": task_queue.get("ingest_profile"),
+            "status": "queued",
+            "created_at": datetime.datetime.utcnow(),
+            "started_at": None,
+            "finished_at": None,
+            "task_queue": task_queue,
+            "files": [
+                {
+                    "file_name": task["file_name"],
+                    "kb_name": task["kb_name"],
+                    "stage": "queued",
+                    "status": "queued",
+                    "timings": {},
+                    "error": None,
+                }
+                for task in task_queue.get("task_queue", [])
+            ],
+        })
+        self._queue.put(job_id)
+        return job_id
+
+    def progress(self, job_id: str, index: int) -> FileProgress:
+        return FileProgress(self.collection, job_id, index)
+
+    def get(self, job_id: str) -> dict:
+        return self.collection.find_one({"job_id": job_id}, {"_id": 0, "task_queue": 0})
+
+    def list(self, kb_owner: str = None, limit: int = 50) -> list:
+        query = {"kb_owner": kb_owner} if kb_owner else {}
+        cursor = self.collection.find(query, {"_id": 0, "task_queue": 0}).sort("created_at", -1).limit(limit)
+        return list(cursor)
+
+    def _worker(self):
+        while True:
+            job_id = self._queue.get()
+            try:
+                self._run(job_id)
+            finally:
+                self._queue.task_done()
+
+    def _run(self, job_id: str):
+        job = self.collection.find_one({"job_id": job_id})
+        if job is None:
+            return
+        # A job that was already running is resumed, keeping its start time
+        started = "resumed_at" if job["status"] == "running" else "started_at"
+        self.collection.update_one(
+            {"job_id": job_id},
+            {"$set": {"status": "running", started: datetime.datetime.utcnow()}}
+        )
+        try:
+            self.handler(job_id, job["task_queue"], self)
+            job = self.collection.find_one({"job_id": job_id}, {"files.status": 1})
+            failed = any(f.get("status") == "error" for f in job.get("files", []))
+            status, error = ("error" if failed else "success"), None
+        except Exception:
+            status, error = "error", traceback.format_exc()
+            logging.error(f"[job {job_id}] failed: {error}")
+        self.collection.update_one(
+            {"job_id": job_id},
+            {"$set": {"status": status, "error": error, "finished_at": datetime.datetime.utcnow()}}
+        )
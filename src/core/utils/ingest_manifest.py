@@ -0,0 +1,133 @@
+"""
+Content-hash ingestion manifest
+
+Every successfully ingested object is recorded per knowledge base under the
+sha256 of its bytes, together with the MinIO ETags it was seen with. Before
+ingesting, `ingest_file` looks the object up:
+
+1. by ETag (from stat_object, no download needed),
+2. otherwise by the sha256 computed while reading the object,
+
+and skips files whose content is already indexed with the same ingestion
+profile; a hit recorded under another profile counts as a miss, so switching
+a knowledge base from "text" to "full" re-indexes its files. Both lookups use
+indexes on (kb_owner, kb_name, ...), so they stay O(1) as the manifest grows.
+
+A skipped file gets no points of its own: its name is kept in the record's
+"aliases". When the original file name is re-ingested with new content, its
+old points and index_info entry are handed over to an alias first
+(ingest_worker), so the alias's content stays searchable.
+"""
+
+import datetime
+import logging
+from typing import Optional
+
+import pymongo
+from pymongo.errors import DuplicateKeyError
+
+from cfg.ingest_settings import INGEST_MANIFEST_COLLECTION
+
+
+class IngestManifest:
+    def __init__(self, collection):
+        self.collection = collection
+        self.collection.create_index(
+            [("kb_owner", pymongo.ASCENDING), ("kb_name", pymongo.ASCENDING), ("sha256", pymongo.ASCENDING)],
+            unique=True,
+        )
+        self.collection.create_index(
+            [("kb_owner", pymongo.ASCENDING), ("kb_name", pymongo.ASCENDING), ("etags", pymongo.ASCENDING)]
+        )
+
+    def find_by_etag(self, kb_owner: str, kb_name: str, etag: str, profile: str) -> Optional[dict]:
+        if not etag:
+            return None
+        return self.collection.find_one(
+            {"kb_owner": kb_owner, "kb_name": kb_name, "etags": etag, "ingest_profile": profile}, {"_id": 0}
+        )
+
+    def find_by_hash(self, kb_owner: str, kb_name: str, sha256: str, profile: str) -> Optional[dict]:
+        return self.collection.find_one(
+            {"kb_owner": kb_owner, "kb_name": kb_name, "sha256": sha256, "ingest_profile": profile}, {"_id": 0}
+        )
+
+    def add_etag(self, kb_owner: str, kb_name: str, sha256: str, etag: str):
+        """Remember another ETag for known content, so the next lookup needs no download"""
+        if etag:
+            self.collection.update_one(
+                {"kb_owner": kb_owner, "kb_name": kb_name, "sha256": sha256},
+                {"$addToSet": {"etags": etag}}
+            )
+
+    def add_alias(self, kb_owner: str, kb_name: str, sha256: str, file_name: str):
+        """Remember a file name that was deduplicated against this content"""
+        self.collection.update_one(
+            {"kb_owner": kb_owner, "kb_name": kb_name, "sha256": sha256, "file_name": {"$ne": file_name}},
+            {"$addToSet": {"aliases": file_name}}
+        )
+
+    def drop_alias(self, kb_owner: str, kb_name: str, file_name: str):
+        """A file name that now has content of its own is no longer an alias"""
+        self.collection.update_many(
+            {"kb_owner": kb_owner, "kb_name": kb_name, "aliases": file_name},
+            {"$pull": {"aliases": file_name}}
+        )
+
+    def find_aliased(self, kb_owner: str, kb_name: str, file_name: str) -> list:
+        """Records indexed under `file_name` that deduplicated files rely on"""
+        return list(self.collection.find(
+            {"kb_owner": kb_owner, "kb_name": kb_name, "file_name": file_name, "aliases.0": {"$exists": True}},
+            {"_id": 0}
+        ))
+
+    def hand_over(self, kb_owner: str, kb_name: str, sha256: str, entry: dict):
+        """Make alias entry["file_name"] the owner of a record whose original file is being replaced"""
+        self.collection.update_one(
+            {"kb_owner": kb_owner, "kb_name": kb_name, "sha256": sha256},
+            {"$set": {"file_name": entry["file_name"], "entry": entry}, "$pull": {"aliases": entry["file_name"]}}
+        )
+
+    def forget(self, kb_owner: str, kb_name: str, file_name: str):
+        """Drop the records of a file name whose content has been replaced"""
+        self.collection.delete_many({"kb_owner": kb_owner, "kb_name": kb_name, "file_name": file_name})
+
+    def record(self, kb_owner: str, kb_name: str, sha256: str, etag: str, size: int, entry: dict):
+        """Record ingested content; `entry["ingest_profile"]` is the profile it was indexed with"""
+        fields = {
+            "size": size,
+            "file_name": entry["file_name"],
+            "ingest_profile": entry["ingest_profile"],
+            "entry": entry,
+            "created_at": datetime.datetime.utcnow(),
+        }
+        try:
+            self.collection.insert_one({
+                "kb_owner": kb_owner,
+                "kb_name": kb_name,
+                "sha256": sha256,
+                "etags": [etag] if etag else [],
+                **fields,
+            })
+        except DuplicateKeyError:
+            # The same content finished concurrently in another worker, or is
+            # recorded under another file name with another profile: the
+            # newest profile wins
+            logging.info(f"Manifest already has {sha256} for {kb_owner}/{kb_name}")
+            self.collection.update_one(
+                {"kb_owner": kb_owner, "kb_name": kb_name, "sha256": sha256, "ingest_profile": {"$ne": entry["ingest_profile"]}},
+                {"$set": fields},
+            )
+            self.add_etag(kb_owner, kb_name, sha256, etag)
+
+
+_manifests = {}
+
+
+def get_manifest(db) -> IngestManifest:
+    """Shared manifest for a pymongo database (indexes are created once per process)"""
+    manifest = _manifests.get(db.name)
+    if manifest is None:
+        manifest = IngestManifest(db[INGEST_MANIFEST_COLLECTION])
+        _manifests[db.name] = manifest
+    return manifest
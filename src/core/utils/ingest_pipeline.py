@@ -0,0 +1,165 @@
+"""
+Streaming page-window ingestion
+
+`convert` runs docling over the whole document and only then does
+`QdrantVecStore.save` start embedding, so peak memory grows with the document
+and nothing is searchable until the end. `stream_ingest` instead runs three
+stages in their own threads, connected by bounded queues:
+
+    parse (one page window at a time: pypdfium2 text layer or docling)
+      -> embed (QdrantVecStore.*_points)
+      -> upsert (Qdrant, batched over parallel connections without waiting)
+
+so parsing the next window, embedding the current one and uploading the
+previous one overlap, and at most INGEST_QUEUE_SIZE windows wait between two
+stages. Each window is released as soon as the next stage has consumed it,
+and with INGEST_MEMORY_LIMIT_MB the window shrinks as the process approaches
+the ceiling (utils/memory.MemoryGuard). Tables are merged within a window only.
+
+Points carry deterministic ids built from their content (not their position),
+so re-ingesting a revised file only embeds and upserts the changed chunks and
+updates the page / coordinates of moved ones; points that no longer occur are
+pruned once the last window is through, after a barrier that waits until every
+batch is applied.
+
+With a `FileCheckpoint` (utils/ingest_checkpoint), every window is recorded
+once Qdrant has acknowledged its points, and an interrupted ingest of the same
+object continues after the last recorded window instead of starting over.
+"""
+
+import logging
+import queue
+import threading
+import traceback
+from typing import Optional
+
+from cfg.ingest_settings import INGEST_PAGE_WINDOW, INGEST_QUEUE_SIZE, DEFAULT_INGEST_PROFILE, INGEST_MEMORY_LIMIT_MB
+from .memory import MemoryGuard
+from .ingest_checkpoint import FileCheckpoint
+from .parse import iter_page_windows
+from .qdrant_store import QdrantVecStore
+
+_DONE = object()
+
+
+class _Stage(threading.Thread):
+    """Consume items from `inbox`, pass fn(item) results to `outbox`."""
+
+    def __init__(self, name, fn, inbox, outbox, errors):
+        super().__init__(name=name, daemon=True)
+        self.fn = fn
+        self.inbox = inbox
+        self.outbox = outbox
+        self.errors = errors
+
+    def run(self):
+        while True:
+            item = self.inbox.get()
+            if item is _DONE:
+                break
+            if self.errors:
+                # An earlier failure: drain the queue so producers never block
+                continue
+            try:
+                result = self.fn(item)
+                # Drop the consumed window before blocking on the next one
+                item = None
+                if self.outbox is not None:
+                    self.outbox.put(result)
+                result = None
+            except Exception:
+                self.errors.append(traceback.format_exc())
+        if self.outbox is not None:
+            self.outbox.put(_DONE)
+
+
+def stream_ingest(kb_name: str, file_name: str, file_loc,
+                  window: int = INGEST_PAGE_WINDOW, queue_size: int = INGEST_QUEUE_SIZE,
+                  on_window=None, previous: Optional[dict] = None,
+                  profile: str = DEFAULT_INGEST_PROFILE, on_finishing=None, bulk: Optional[bool] = None,
+                  checkpoint: Optional[FileCheckpoint] = None) -> dict:
+    """
+    Ingest `file_loc` (a path or an ObjectSource) window by window and return
+    the same status dict as `QdrantVecStore.save`. `on_window(start, end)` is
+    called after a window has been upserted. `previous` is the index_info entry
+    of an earlier ingest of the file, whose collections are updated in place.
+    `profile` is the ingestion profile (INGEST_PROFILES) of the knowledge base.
+    `on_finishing()` is called once every window is sent, before waiting for
+    the uploads and the index build. `bulk` overrides INGEST_BULK_LOAD.
+    `checkpoint` records every uploaded window and resumes an interrupted ingest.
+    """
+    resume = checkpoint.load() if checkpoint is not None else None
+    if resume is not None:
+        # Continue in the collections the interrupted ingest was writing to
+        previous = resume["collections"]
+    store = QdrantVecStore(kb_name, file_name, previous, profile, bulk)
+    errors = []
+    # Pages read from the text layer (pdfium), converted by docling, and OCR'd by docling
+    parsed = {"pdfium": 0, "docling": 0, "ocr": 0}
+    first_page = 1
+    if resume is not None:
+        store.restore(resume["kept_ids"], resume["changes"], resume["ordinals"])
+        parsed.update(resume["parsed"])
+        first_page = resume["pages_done"] + 1
+        logging.info(f"{file_name}: resuming after page {resume['pages_done']}")
+    elif checkpoint is not None:
+        checkpoint.start({
+            "texts_table_name": store.texts_collection_name,
+            "images_table_name": store.images_collection_name,
+            "tables_table_name": store.tables_collection_name,
+        })
+
+    def embed(item):
+        data, meta_data, pages = item
+        parsed[data.get("parser", "docling")] += pages[1] - pages[0] + 1
+        points = store.text_points(data), store.image_points(data), store.table_points(meta_data)
+        # What a checkpoint of this window records, as of this window
+        state = store.take_window_state(), dict(store.changes), dict(parsed)
+        return (pages, *points, state)
+
+    def upsert(item):
+        (start, end), texts, images, tables, (window_state, changes, window_parsed) = item
+        store.upsert_points(store.texts_collection_name, texts)
+        store.upsert_points(store.images_collection_name, images)
+        store.upsert_points(store.tables_collection_name, tables)
+        logging.info(f"{file_name}: pages {start}-{end} sent ({len(texts)} texts, {len(images)} images, {len(tables)} tables written)")
+        if checkpoint is not None:
+            # Only a window Qdrant has acknowledged may be skipped after a restart
+            store.wait_sent()
+            checkpoint.window_done((start, end), window_state, changes, window_parsed)
+        if on_window is not None:
+            on_window(start, end)
+
+    converted = queue.Queue(maxsize=queue_size)
+    embedded = queue.Queue(maxsize=queue_size)
+    stages = [
+        _Stage("ingest-embed", embed, converted, embedded, errors),
+        _Stage("ingest-upsert", upsert, embedded, None, errors),
+    ]
+    for stage in stages:
+        stage.start()
+
+    # Parsing runs on the calling thread and feeds the pipeline
+    try:
+        guard = MemoryGuard(max_window=window) if INGEST_MEMORY_LIMIT_MB else None
+        for item in iter_page_windows(file_loc, window, profile, guard=guard, first_page=first_page):
+            if errors:
+                break
+            converted.put(item)
+            item = None
+    except Exception:
+        errors.append(traceback.format_exc())
+    finally:
+        converted.put(_DONE)
+        for stage in stages:
+            stage.join()
+
+    if errors:
+        raise RuntimeError(f"Streaming ingestion of {file_name} failed:\n{errors[0]}")
+
+    if on_finishing is not None:
+        on_finishing()
+    status = store.finish()
+    status["parsed"] = parsed
+    logging.info(f"{file_name}: {parsed['pdfium']} pages from the text layer, {parsed['docling']} through docling, {parsed['ocr']} OCR'd")
+    return status
@@ -0,0 +1,114 @@
+"""
+Parallel multi-file ingestion
+
+A job with several files is spread over a pool of INGEST_PROCESSES worker
+processes. Each worker gets CPU_TOTAL_CORES / INGEST_PROCESSES cores of the
+CPU budget, loads its embedding models and docling pipeline once in the pool
+initializer and keeps them for its whole life. Workers report per-file
+progress straight to the job document and commit the index_info entry of
+every file they finish.
+"""
+
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterable, List, Optional
+
+import pymongo
+
+from cfg.cpu_settings import CPU_TOTAL_CORES
+from cfg.ingest_settings import INGEST_PROCESSES, INGEST_JOBS_COLLECTION
+from .ingest_jobs import FileProgress
+
+_pool: Optional[ProcessPoolExecutor] = None
+_jobs_collection = None
+
+
+def _init_worker(cores: int):
+    """Runs once in every worker process: size the CPU budget, then load the models"""
+    global _jobs_collection
+    from .cpu_budget import set_total_cores
+    from .warmup import preload_ingest_models
+
+    set_total_cores(cores)
+    client = pymongo.MongoClient(
+        os.getenv("MONGO_SERVER", "mongodb://localhost:27017"),
+        username=os.getenv("MONGO_INITDB_ROOT_USERNAME", "root"),
+        password=os.getenv("MONGO_INITDB_ROOT_PASSWORD", "example"),
+    )
+    _jobs_collection = client["mortis"][INGEST_JOBS_COLLECTION]
+    preload_ingest_models()
+    logging.info(f"Ingest worker {os.getpid()} ready with {cores} cores")
+
+
+def _run_file(job_id: str, index: int, task: dict, kb_owner: str, previous: Optional[dict]) -> Optional[dict]:
+    from .ingest_worker import run_file
+
+    return run_file(_jobs_collection, job_id, index, task, kb_owner, previous)
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        cores = max(1, CPU_TOTAL_CORES // INGEST_PROCESSES)
+        # spawn: the parent holds ONNX sessions and threads that must not be forked
+        _pool = ProcessPoolExecutor(
+            max_workers=INGEST_PROCESSES,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(cores,),
+        )
+    return _pool
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def run_files_parallel(collection, job_id: str, tasks: List[dict], kb_owner: str,
+                       previous: Optional[dict] = None, skip: Iterable[int] = ()) -> dict:
+    """
+    Ingest `tasks` on the process pool; `collection` is the job collection,
+    used to mark files whose worker process died. `previous` maps file names to
+    their current index_info entries. Tasks whose index is in `skip` (finished
+    before the job was resumed) are left out.
+
+    Returns {"entries": [index_info entry or None, ...] (task order),
+             "throughput": {"files", "seconds", "files_per_minute"}}
+    """
+    started = time.perf_counter()
+    pool = get_pool()
+    previous = previous or {}
+    skip = set(skip)
+    futures = {
+        pool.submit(_run_file, job_id, idx, task, kb_owner, previous.get(task["file_name"])): idx
+        for idx, task in enumerate(tasks) if idx not in skip
+    }
+    entries = [None] * len(tasks)
+    broken = False
+    for future in as_completed(futures):
+        idx = futures[future]
+        try:
+            entries[idx] = future.result()
+        except Exception as e:
+            # A worker process died (e.g. OOM); run_file already handles ordinary errors
+            logging.error(f"[job {job_id}] worker for file {idx} crashed: {e}")
+            FileProgress(collection, job_id, idx).fail(f"Ingest worker process crashed: {e!r}")
+            broken = broken or isinstance(e, BrokenProcessPool)
+    if broken:
+        shutdown_pool()
+    seconds = time.perf_counter() - started
+    done = sum(1 for e in entries if e is not None)
+    throughput = {
+        "files": done,
+        "seconds": round(seconds, 3),
+        "files_per_minute": round(done / seconds * 60, 2) if seconds > 0 else 0.0,
+    }
+    logging.info(f"[job {job_id}] ingested {done}/{len(futures)} files on {INGEST_PROCESSES} processes: {throughput['files_per_minute']} files/min")
+    return {"entries": entries, "throughput": throughput}
@@ -0,0 +1,187 @@
+"""
+Single-file ingestion
+
+`run_file` reads one object from MinIO, converts it and writes it to
+Qdrant, reporting progress on the job document. It is shared by the
+in-process ingest workers and the worker processes of `ingest_pool`, so it
+only depends on environment configuration, not on state held by main.py.
+
+Every ingested file is committed to the knowledge base's index_info document
+as soon as it is done (`commit_index_entry`), and streamed files checkpoint
+their page windows (utils/ingest_checkpoint), so a restart only loses the
+window in progress.
+"""
+
+import logging
+import os
+import traceback
+from typing import Optional
+
+from minio import Minio
+
+from cfg.ingest_settings import INGEST_STREAMING, DEFAULT_INGEST_PROFILE, INGEST_MEMORY_LIMIT_MB
+from .ingest_checkpoint import get_checkpoints
+from .ingest_jobs import FileProgress
+from .ingest_manifest import IngestManifest, get_manifest
+from .ingest_pipeline import stream_ingest
+from .memory import PeakRss, release_memory
+from .object_source import open_object
+from .parse import convert, page_count
+from .qdrant_store import relabel_points, save_vec_store
+
+MINIO_USER = os.getenv("MINIO_ROOT_USER", "root")
+MINIO_PASSWORD = os.getenv("MINIO_ROOT_PASSWORD", "password")
+
+
+def minio_client() -> Minio:
+    return Minio(
+        "minio:9000",
+        access_key=MINIO_USER,
+        secret_key=MINIO_PASSWORD,
+        secure=False,
+    )
+
+
+def commit_index_entry(db, kb_owner: str, kb_name: str, entry: dict):
+    """
+    Add `entry` to the files of index_info (collection `kb_owner`), replacing
+    an entry with the same file name, in one atomic update
+    """
+    db[kb_owner].update_one(
+        {"kb_name": kb_name},
+        [{"$set": {"files": {"$concatArrays": [
+            {"$filter": {
+                "input": {"$ifNull": ["$files", []]},
+                "cond": {"$ne": ["$$this.file_name", entry["file_name"]]},
+            }},
+            {"$literal": [entry]},
+        ]}}}],
+        upsert=True,
+    )
+
+
+def remove_index_entry(db, kb_owner: str, kb_name: str, file_name: str):
+    """Drop the index_info entry of `file_name`"""
+    db[kb_owner].update_one({"kb_name": kb_name}, {"$pull": {"files": {"file_name": file_name}}})
+
+
+def hand_over_aliases(db, manifest: IngestManifest, kb_owner: str, kb_name: str, previous: dict) -> bool:
+    """
+    `previous.file_name` is about to be re-ingested with new content. Files
+    deduplicated against its old content only live on through its points, so
+    the old points, index_info entry and manifest record go to the first of
+    those aliases, and the file is re-ingested into new collections.
+    Returns whether anything was handed over.
+    """
+    handed_over = False
+    for record in manifest.find_aliased(kb_owner, kb_name, previous["file_name"]):
+        heir = record["aliases"][0]
+        entry = {**previous, "file_name": heir}
+        relabel_points(previous, heir)
+        commit_index_entry(db, kb_owner, kb_name, entry)
+        manifest.hand_over(kb_owner, kb_name, record["sha256"], entry)
+        logging.info(f"{previous['file_name']} is replaced: its old content stays indexed as {heir}")
+        handed_over = True
+    if handed_over:
+        # Until its new content is committed, the file name has no entry
+        remove_index_entry(db, kb_owner, kb_name, previous["file_name"])
+    return handed_over
+
+
+def ingest_file(task: dict, progress: FileProgress, kb_owner: str, manifest: IngestManifest,
+                previous: Optional[dict] = None) -> dict:
+    """
+    Ingest one task of a task_queue and return its index_info entry.
+    Content already in the manifest with the same ingestion profile is skipped
+    and returned as {"file_name", "status": "deduplicated", "duplicate_of"}. `previous` is the
+    index_info entry of an earlier version of the file, updated incrementally.
+    The entry is committed to index_info before the manifest records it.
+    """
+    kb_name:str = task["kb_name"]
+    file_name = task["file_name"]
+    profile = task.get("ingest_profile", DEFAULT_INGEST_PROFILE)
+    client = minio_client()
+    stat = client.stat_object(kb_name.lower(), file_name)
+    known = manifest.find_by_etag(kb_owner, kb_name, (stat.etag or "").strip('"'), profile)
+    if known is not None:
+        manifest.add_alias(kb_owner, kb_name, known["sha256"], file_name)
+        return {"file_name": file_name, "status": "deduplicated", "duplicate_of": known["file_name"]}
+
+    progress.stage("downloading")
+    with open_object(client, kb_name.lower(), file_name, stat=stat) as source:
+        known = manifest.find_by_hash(kb_owner, kb_name, source.sha256, profile)
+        if known is not None:
+            manifest.add_etag(kb_owner, kb_name, source.sha256, source.etag)
+            manifest.add_alias(kb_owner, kb_name, source.sha256, file_name)
+            return {"file_name": file_name, "status": "deduplicated", "duplicate_of": known["file_name"]}
+
+        db = progress.collection.database
+        if previous is not None and hand_over_aliases(db, manifest, kb_owner, kb_name, previous):
+            previous = None
+        logging.info(f"Processing file: {file_name} ({'memory' if source.in_memory else 'spooled to disk'})")
+        if INGEST_STREAMING or INGEST_MEMORY_LIMIT_MB:
+            # Parse, embed and upsert page windows as they become available
+            checkpoint = get_checkpoints(progress.collection.database).file(progress.job_id, progress.index, source.etag)
+            # A resumed file continues from its checkpoint
+            progress.stage("streaming", pages=page_count(source), pages_done=checkpoint.pages_done())
+            status = stream_ingest(
+                kb_name, file_name, source,
+                on_window=lambda start, end: progress.update(pages_done=end),
+                previous=previous,
+                profile=profile,
+                on_finishing=lambda: progress.stage("optimizing"),
+                checkpoint=checkpoint,
+            )
+        else:
+            progress.stage("parsing")
+            data, meta_data = convert(source, profile)
+            # Save the vector store
+            logging.info(f"Converting Complete, saving to vector store...")
+            progress.stage("indexing")
+            status = save_vec_store(kb_name, file_name, data, meta_data, previous, profile)
+        logging.info(f"status: {status}, texts_collection_name: {status['texts_collection_name']}, images_collection_name: {status['images_collection_name']}")
+        entry = {
+            "file_name": file_name,
+            "status": status['status'],
+            "texts_table_name": status['texts_collection_name'],
+            "images_table_name": status['images_collection_name'],
+            "tables_table_name": status['tables_collection_name'],
+            "changes": status['changes'],
+            "ingest_profile": profile,
+            "parsed": status.get("parsed"),
+            "indexed": status["indexed"],
+        }
+        commit_index_entry(db, kb_owner, kb_name, entry)
+        # The file's earlier content is no longer indexed under this name, and
+        # the file is no longer an alias of other content
+        manifest.forget(kb_owner, kb_name, file_name)
+        manifest.drop_alias(kb_owner, kb_name, file_name)
+        manifest.record(kb_owner, kb_name, source.sha256, source.etag, source.size, entry)
+    return entry
+
+
+def run_file(collection, job_id: str, index: int, task: dict, kb_owner: str,
+             previous: Optional[dict] = None) -> Optional[dict]:
+    """
+    Ingest file `index` of job `job_id`; returns its index_info entry (or the
+    deduplicated marker), or None on failure. `collection` is the job collection.
+    The file's checkpoint is dropped once it is done or has failed.
+    """
+    progress = FileProgress(collection, job_id, index)
+    rss = PeakRss()
+    try:
+        with rss:
+            entry = ingest_file(task, progress, kb_owner, get_manifest(collection.database), previous)
+        if entry["status"] == "deduplicated":
+            progress.done("deduplicated", duplicate_of=entry["duplicate_of"], peak_rss_mb=rss.peak_mb)
+        else:
+            progress.done(entry["status"], changes=entry["changes"], parsed=entry["parsed"], indexed=entry["indexed"],
+                          peak_rss_mb=rss.peak_mb)
+        return entry
+    except Exception:
+        progress.fail(str(traceback.format_exc()))
+        progress.update(peak_rss_mb=rss.peak_mb)
+        return None
+    finally:
+        get_checkpoints(collection.database).clear(job_id, index)
+        release_memory()
@@ -0,0 +1,102 @@
+"""
+Ingestion memory accounting
+
+- `rss_bytes()`: current resident set size of the process
+- `PeakRss`: samples the RSS in a background thread while a file is ingested
+- `MemoryGuard`: adapts the page window of streaming ingestion to
+  INGEST_MEMORY_LIMIT_MB, so that large documents are processed in smaller
+  windows instead of running the container out of memory
+
+All numbers are per process: with several ingest worker threads they include
+the other files ingested at the same time.
+"""
+
+import ctypes
+import gc
+import logging
+import os
+import resource
+import threading
+
+from cfg.ingest_settings import INGEST_MEMORY_LIMIT_MB, INGEST_MEMORY_SOFT_RATIO, INGEST_PAGE_WINDOW, INGEST_RSS_SAMPLE_SECONDS
+
+MB = 1024 * 1024
+
+try:
+    _libc = ctypes.CDLL("libc.so.6")
+except OSError:
+    _libc = None
+
+
+def rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        # Outside Linux: the peak so far is the best we get
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def release_memory():
+    """Collect garbage and hand freed heap pages back to the OS"""
+    gc.collect()
+    if _libc is not None:
+        _libc.malloc_trim(0)
+
+
+class PeakRss:
+    """Context manager recording the peak RSS (bytes) seen while it is active"""
+
+    def __init__(self, interval: float = INGEST_RSS_SAMPLE_SECONDS):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+
+    def sample(self):
+        self.peak = max(self.peak, rss_bytes())
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    @property
+    def peak_mb(self) -> float:
+        return round(self.peak / MB, 1)
+
+    def __enter__(self):
+        self.sample()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.sample()
+        return False
+
+
+class MemoryGuard:
+    """Chooses the size of the next page window from the current RSS"""
+
+    def __init__(self, limit_mb: int = INGEST_MEMORY_LIMIT_MB, max_window: int = INGEST_PAGE_WINDOW):
+        self.limit = limit_mb * MB
+        self.max_window = max_window
+
+    def next_window(self, window: int) -> int:
+        if not self.limit:
+            return window
+        soft = self.limit * INGEST_MEMORY_SOFT_RATIO
+        rss = rss_bytes()
+        if rss > soft:
+            release_memory()
+            rss = rss_bytes()
+        if rss > soft:
+            if window > 1:
+                logging.info(f"RSS {rss // MB} MB near the {self.limit // MB} MB ceiling: page window {window} -> {max(1, window // 2)}")
+            elif rss > self.limit:
+                logging.warning(f"RSS {rss // MB} MB above the {self.limit // MB} MB ceiling with single-page windows")
+            return max(1, window // 2)
+        if rss < soft / 2 and window < self.max_window:
+            return min(self.max_window, window * 2)
+        return window
@@ -0,0 +1,111 @@
+"""
+Process-wide embedding model registry
+
+Loading a fastembed model creates a fresh ONNX session (and may download the
+weights), which dominates query latency when done per request. This module
+keeps one instance of each model per process and hands the same handle to
+every caller. Sessions are safe to share across threads for inference, so
+only the first load is guarded by a lock.
+
+Each model is created once per CPU budget role ("query_embed" for search,
+"ingest_embed" for ingestion) with the thread count `cpu_budget` assigns to
+that role, so ingestion cannot starve query embedding.
+
+Text models honour EMB_PRECISION: with "int8" the dynamically quantized ONNX
+export listed in INT8_MODEL_SOURCES is registered with fastembed and used
+instead of the fp32 weights.
+"""
+
+import logging
+import threading
+from typing import Callable, Dict, Tuple
+
+from fastembed import TextEmbedding, ImageEmbedding  # type: ignore
+from cfg.emb_settings import EMB_PRECISION, INT8_MODEL_SOURCES, TEXT_EMB_DIM
+from .cpu_budget import threads_for
+
+_models: Dict[Tuple[str, ...], object] = {}
+_lock = threading.Lock()
+_custom_models = set()
+
+
+def _get_or_load(key: Tuple[str, ...], factory: Callable[[], object]):
+    model = _models.get(key)
+    if model is not None:
+        return model
+    with _lock:
+        # Another thread may have finished loading while we waited
+        model = _models.get(key)
+        if model is None:
+            logging.info(f"Loading model: {key}")
+            model = factory()
+            _models[key] = model
+    return model
+
+
+def resolve_text_model(model_name: str, precision: str = None) -> str:
+    """
+    Map a configured model name to the fastembed model that should be loaded.
+
+    For precision "int8" the quantized export is registered (once) as a custom
+    fastembed model named "<model_name>-int8". Models without a quantized
+    source stay fp32.
+    """
+    precision = precision or EMB_PRECISION
+    if precision == "fp32":
+        return model_name
+    if precision != "int8":
+        raise ValueError(f"Unknown embedding precision: {precision}")
+    if model_name not in INT8_MODEL_SOURCES:
+        # e.g. the CLIP text tower, which has no quantized export configured
+        return model_name
+
+    int8_name = f"{model_name}-int8"
+    if int8_name in _custom_models:
+        return int8_name
+    with _lock:
+        if int8_name not in _custom_models:
+            from fastembed.common.model_description import ModelSource, PoolingType  # type: ignore
+
+            repo, model_file = INT8_MODEL_SOURCES[model_name]
+            TextEmbedding.add_custom_model(
+                model=int8_name,
+                pooling=PoolingType.MEAN,
+                normalization=True,
+                sources=ModelSource(hf=repo),
+                dim=TEXT_EMB_DIM,
+                model_file=model_file,
+            )
+            _custom_models.add(int8_name)
+    return int8_name
+
+
+def get_text_model(model_name: str, precision: str = None, role: str = "query_embed") -> TextEmbedding:
+    """Return the shared TextEmbedding for `model_name` and `role`, loading it on first use."""
+    resolved = resolve_text_model(model_name, precision)
+    threads = threads_for(role)
+    return _get_or_load(
+        ("text", resolved, role),
+        lambda: TextEmbedding(model_name=resolved, threads=threads)
+    )
+
+
+def get_image_model(model_name: str, role: str = "ingest_embed") -> ImageEmbedding:
+    """Return the shared ImageEmbedding for `model_name` and `role`, loading it on first use."""
+    threads = threads_for(role)
+    return _get_or_load(
+        ("image", model_name, role),
+        lambda: ImageEmbedding(model_name=model_name, threads=threads)
+    )
+
+
+def get_tokenizer(model_name: str):
+    """Return the shared Hugging Face tokenizer for `model_name`."""
+    from transformers import AutoTokenizer
+
+    return _get_or_load(("tokenizer", model_name), lambda: AutoTokenizer.from_pretrained(model_name))
+
+
+def loaded_models() -> list:
+    """List the (kind, model_name[, role]) keys currently held by the registry."""
+    return list(_models.keys())
@@ -1,9 +1,13 @@
+import functools
 import json
 import logging
 import os
+import threading
 import time
 import pandas as pd
+import pypdfium2 as pdfium
 from pathlib import Path
+from types import SimpleNamespace
 
 from docling.backend.pypdfium2_backend import PyPdfiumDocumentBackend
 from docling.datamodel.base_models import FigureElement, InputFormat, Table
@@ -17,53 +21,198 @@ from docling.models.tesseract_ocr_model import TesseractOcrOptions
 from docling_core.types.doc import ImageRefMode, PictureItem, TableItem
 import tesserocr
 
-CORES = os.cpu_count()-1 or 1
+from cfg.ingest_settings import INGEST_PROFILES, DEFAULT_INGEST_PROFILE, INGEST_FAST_PARSE, INGEST_OCR_LANG
+from .cpu_budget import threads_for
+from .fast_parse import pdfium_lock, classify_pages, page_runs, fast_convert_pages
+from .memory import MemoryGuard
+from .object_source import ObjectSource
 
-def convert(file_loc:str) -> dict:
+# Converters are expensive to set up (layout / table models), so one is kept
+# per pipeline profile for the life of the worker process.
+_converters = {}
+_converters_lock = threading.Lock()
+
+@functools.lru_cache(maxsize=None)
+def ocr_languages() -> tuple:
+    """
+    INGEST_OCR_LANG restricted to the languages Tesseract has traineddata for:
+    a missing language would make every OCR'd page fail
+    """
+    _, installed = tesserocr.get_languages()
+    langs = tuple(lang for lang in INGEST_OCR_LANG if lang in installed)
+    missing = [lang for lang in INGEST_OCR_LANG if lang not in installed]
+    if missing:
+        logging.warning(f"Tesseract has no traineddata for {missing}; OCR uses {list(langs or installed[:1])}")
+    return langs or tuple(installed[:1])
+
+def build_converter(profile:str = DEFAULT_INGEST_PROFILE, ocr:bool = True) -> DocumentConverter:
+    options = INGEST_PROFILES[profile]
     pipeline_options = PdfPipelineOptions()
 
     accelerator_options = AcceleratorOptions(
-        num_threads=CORES, device=AcceleratorDevice.AUTO
+        num_threads=threads_for("ingest_parse"), device=AcceleratorDevice.AUTO
     )
 
-    pipeline_options.images_scale = 2.0
-    pipeline_options.generate_page_images = True
-    pipeline_options.generate_picture_images = True
+    # Page / picture rendering is only paid for by profiles that embed pictures
+    pipeline_options.images_scale = options["images_scale"]
+    pipeline_options.generate_page_images = options["pictures"]
+    pipeline_options.generate_picture_images = options["pictures"]
+    pipeline_options.do_table_structure = options["tables"]
+    pipeline_options.do_ocr = ocr
+    if ocr:
+        pipeline_options.ocr_options = TesseractOcrOptions(lang=list(ocr_languages()))
     pipeline_options.accelerator_options = accelerator_options
 
-    converter = DocumentConverter(
+    # Without table structure the lighter pypdfium2 backend is enough
+    format_option = PdfFormatOption(pipeline_options=pipeline_options)
+    if not options["tables"]:
+        format_option = PdfFormatOption(pipeline_options=pipeline_options, backend=PyPdfiumDocumentBackend)
+
+    return DocumentConverter(
             format_options={
-                InputFormat.PDF: PdfFormatOption(pipeline_options=pipeline_options)
+                InputFormat.PDF: format_option
             }
         )
+
+def get_converter(profile:str = DEFAULT_INGEST_PROFILE, ocr:bool = None) -> DocumentConverter:
+    """
+    Return the cached converter for a pipeline profile:
+    - an ingestion profile of INGEST_PROFILES, used for uploaded files, with
+      or without OCR (`ocr` None: unless the profile's ocr is "never")
+    - "plain": docling defaults, used by table_convert
+    """
+    if ocr is None:
+        ocr = profile in INGEST_PROFILES and INGEST_PROFILES[profile]["ocr"] != "never"
+    key = (profile, ocr)
+    converter = _converters.get(key)
+    if converter is not None:
+        return converter
+    with _converters_lock:
+        converter = _converters.get(key)
+        if converter is None:
+            if profile in INGEST_PROFILES:
+                converter = build_converter(profile, ocr)
+            elif profile == "plain":
+                converter = DocumentConverter()
+            else:
+                raise ValueError(f"Unknown pipeline profile: {profile}")
+            _converters[key] = converter
+    return converter
+
+def _docling_source(source):
+    """A path, or an ObjectSource read from MinIO"""
+    return source.docling() if isinstance(source, ObjectSource) else source
+
+def convert(file_loc, profile:str = DEFAULT_INGEST_PROFILE) -> dict:
+    converter = get_converter(profile)
     
-    result = converter.convert(file_loc)
+    result = converter.convert(_docling_source(file_loc))
     out = result.document.export_to_dict()
     return out, result
 
+def _pdf_source(file_loc):
+    """(suffix, pypdfium2 source) of a path or an ObjectSource"""
+    if isinstance(file_loc, ObjectSource):
+        return file_loc.suffix, file_loc.pdfium()
+    return Path(file_loc).suffix.lower(), file_loc
+
+def page_count(file_loc) -> int:
+    """Number of pages of a PDF, 0 for formats without pages"""
+    suffix, pdf_source = _pdf_source(file_loc)
+    if suffix != ".pdf":
+        return 0
+    with pdfium_lock:
+        pdf = pdfium.PdfDocument(pdf_source)
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
+
+def convert_pages(file_loc, start:int, end:int, converter:DocumentConverter = None):
+    """
+    Convert only pages start..end (1-based, inclusive) of a PDF. Only the
+    document is kept of the conversion result: the rendered page images and
+    backends are released right away.
+    """
+    converter = converter or get_converter()
+    result = converter.convert(_docling_source(file_loc), page_range=(start, end))
+    out = result.document.export_to_dict()
+    return out, SimpleNamespace(document=result.document)
+
+def iter_page_windows(file_loc, window:int, profile:str = DEFAULT_INGEST_PROFILE, fast:bool = INGEST_FAST_PARSE,
+                      guard:MemoryGuard = None, first_page:int = 1):
+    """
+    Yield (data, meta_data, (start, end)) for consecutive page windows from
+    `first_page` on (a resumed ingest). Documents without pages are converted
+    as one window. With a `guard`, the size of every window is adapted to the
+    memory ceiling.
+
+    Every page is classified first (fast_parse.classify_pages): with `fast`,
+    pages with a usable text layer are read with pypdfium2 (meta_data is None
+    for those); the others are converted by docling, with OCR only for pages
+    that need it. A window is therefore yielded as one or more page runs;
+    data["parser"] tells which parser produced a run.
+    """
+    pages = page_count(file_loc)
+    if pages == 0:
+        if first_page > 1:
+            return
+        data, meta_data = convert(file_loc, profile)
+        yield data, meta_data, (1, 1)
+        return
+    with pdfium_lock:
+        pdf = pdfium.PdfDocument(_pdf_source(file_loc)[1])
+    try:
+        start = first_page
+        while start <= pages:
+            if guard is not None:
+                window = guard.next_window(window)
+            end = min(start + window - 1, pages)
+            with pdfium_lock:
+                runs = page_runs(classify_pages(pdf, start, end, profile, fast), start)
+            for mode, first, last in runs:
+                if mode == "pdfium":
+                    with pdfium_lock:
+                        data = fast_convert_pages(pdf, first, last)
+                    yield data, None, (first, last)
+                else:
+                    data, meta_data = convert_pages(file_loc, first, last, get_converter(profile, ocr=mode == "ocr"))
+                    data["parser"] = mode
+                    yield data, meta_data, (first, last)
+                # Do not hold on to a window while the next one is converted
+                data = meta_data = None
+            start = end + 1
+    finally:
+        with pdfium_lock:
+            pdf.close()
+
+def warmup(profile:str = DEFAULT_INGEST_PROFILE):
+    """Download and load the docling layout / table / OCR models ahead of the first file."""
+    get_converter(profile, ocr=False).initialize_pipeline(InputFormat.PDF)
+    if INGEST_PROFILES[profile]["ocr"] != "never":
+        get_converter(profile, ocr=True).initialize_pipeline(InputFormat.PDF)
+
 def merge_adjacent_tables(meta_data):
-    all_tables = []
+    """
+    Merge tables continued across pages: a headerless table (0..n column
+    labels) with the same width as the previous one is appended to it.
+    Parts are collected per merged table and concatenated once.
+    """
+    groups = []
 
-    # for i in range(len(meta_data.document.tables)):
     for idx, table in enumerate(meta_data.document.tables):
         table_df = table.export_to_dataframe()
-        print(f"\nProcessing table {idx}, shape: {table_df.shape}")
 
         # 檢查是否符合合併條件
-        if all_tables and list(table_df.columns.values) == list(range(len(table_df.columns))) and len(all_tables[-1].columns) == len(table_df.columns):
-            print(f"  Merging table {idx} with previous table")
-            unify_columns = list(all_tables[-1].columns)
-            table_df.columns = unify_columns
-
-            table_df = pd.concat([all_tables[-1], table_df], ignore_index=True)
-            all_tables.pop()
+        if groups and list(table_df.columns.values) == list(range(len(table_df.columns))) and len(groups[-1][0].columns) == len(table_df.columns):
+            table_df.columns = list(groups[-1][0].columns)
+            groups[-1].append(table_df)
         else:
-            print(f"  Table {idx} added without merging")
-
-        all_tables.append(table_df)
+            groups.append([table_df])
 
-    print(f"\nTotal merged tables: {len(all_tables)}")
+    all_tables = [parts[0] if len(parts) == 1 else pd.concat(parts, ignore_index=True) for parts in groups]
+    logging.info(f"Merged {len(meta_data.document.tables)} tables into {len(all_tables)}")
     return all_tables
 
 def table_convert(file_loc: str) -> dict:
-    return DocumentConverter().convert(source=file_loc).document
\ No newline at end of file
+    return get_converter("plain").convert(source=file_loc).document
\ No newline at end of file
@@ -9,6 +9,62 @@ from qdrant_client import QdrantClient
 from qdrant_client.http import models
 from qdrant_client.http.models import Filter
 from .math_transform import calculate_centroid, one_y_point
+from .query_cache import embed_query
+
+def parse_filter_conditions(filters: List[str]) -> Optional[models.Filter]:
+    """
+    Converts filter strings such as "year < 2024" into a Qdrant Filter.
+
+    Returns None when no filter string could be parsed.
+    """
+    must_conditions = []
+    for filter_condition in filters:
+        # Parse filter conditions
+        # Example: "year < 2024" -> field=year, op=<, value=2024
+        parts = filter_condition.split()
+        if len(parts) == 3:
+            field, op, value = parts
+            
+            # Convert value to appropriate type
+            try:
+                value = int(value)
+            except ValueError:
+                try:
+                    value = float(value)
+                except ValueError:
+                    # Keep as string
+                    pass
+            
+            # Create condition based on operator
+            if op == "==":
+                must_conditions.append(
+                    models.FieldCondition(
+                        key=field, 
+                        match=models.MatchValue(value=value)
+                    )
+                )
+            elif op in ("<", ">", "<=", ">="):
+                range_params = {}
+                if op == "<":
+                    range_params["lt"] = value
+                elif op == ">":
+                    range_params["gt"] = value
+                elif op == "<=":
+                    range_params["lte"] = value
+                elif op == ">=":
+                    range_params["gte"] = value
+                
+                must_conditions.append(
+                    models.FieldCondition(
+                        key=field, 
+                        range=models.Range(**range_params)
+                    )
+                )
+    
+    if must_conditions:
+        return models.Filter(must=must_conditions)
+    return None
+
 
 def qdrant_search(
     db_name: str,
@@ -83,63 +139,14 @@ def qdrant_search(
         
         # Handle filter conditions
         if 'filter' in conditions:
-            must_conditions = []
-            for filter_condition in conditions['filter']:
-                # Parse filter conditions
-                # Example: "year < 2024" -> field=year, op=<, value=2024
-                parts = filter_condition.split()
-                if len(parts) == 3:
-                    field, op, value = parts
-                    
-                    # Convert value to appropriate type
-                    try:
-                        value = int(value)
-                    except ValueError:
-                        try:
-                            value = float(value)
-                        except ValueError:
-                            # Keep as string
-                            pass
-                    
-                    # Create condition based on operator
-                    if op == "==":
-                        must_conditions.append(
-                            models.FieldCondition(
-                                key=field, 
-                                match=models.MatchValue(value=value)
-                            )
-                        )
-                    elif op in ("<", ">", "<=", ">="):
-                        range_params = {}
-                        if op == "<":
-                            range_params["lt"] = value
-                        elif op == ">":
-                            range_params["gt"] = value
-                        elif op == "<=":
-                            range_params["lte"] = value
-                        elif op == ">=":
-                            range_params["gte"] = value
-                        
-                        must_conditions.append(
-                            models.FieldCondition(
-                                key=field, 
-                                range=models.Range(**range_params)
-                            )
-                        )
-            
-            if must_conditions:
-                filter_conditions = models.Filter(must=must_conditions)
+            filter_conditions = parse_filter_conditions(conditions['filter'])
     
     # If no vector query but we have text query, use text for search
     if not search_vector and conditions and 'text' in conditions:
-        from fastembed import TextEmbedding
         from cfg.emb_settings import EMB_MODEL
         
-        embedding_model = TextEmbedding(model_name=EMB_MODEL)
         text_query = conditions['text'][0]['query']
-        search_vector = list(embedding_model.embed([text_query]))[0]
-        if hasattr(search_vector, 'tolist'):
-            search_vector = search_vector.tolist()
+        search_vector = embed_query(EMB_MODEL, text_query)
     
     # Perform search
     if search_vector:
@@ -207,6 +214,81 @@ def qdrant_search(
         return [result_data]
 
 
+def qdrant_batch_search(
+    db_name: str,
+    collection_name: str,
+    select_cols: List[str],
+    query_vectors: List[List[float]],
+    filters: List[str] = None,
+    limit: int = 10,
+    return_format: str = "pl"
+) -> List[Any]:
+    """
+    Runs many dense vector queries against one Qdrant collection in a single request.
+
+    - **db_name**: Name of the database (for compatibility, not directly used by Qdrant).
+    - **collection_name**: The Qdrant collection to search within.
+    - **select_cols**: A list of column names to include in the results.
+    - **query_vectors**: One embedding per query, already produced by the caller.
+    - **filters**: Optional filter strings, same syntax as `conditions["filter"]` in `qdrant_search`.
+    - **limit**: The maximum number of results to return per query.
+    - **return_format**: The desired format for each query's results ("pl", "pd", "arrow", "raw").
+
+    Returns one result per query vector, in the same order; empty results if
+    the collection does not exist. Raises if Qdrant rejects the batch.
+    """
+    QDRANT_HOST = os.getenv("QDRANT_HOST", "qdrant")
+    QDRANT_PORT = int(os.getenv("QDRANT_PORT", "6333"))
+    
+    # Initialize connection
+    client = QdrantClient(host=QDRANT_HOST, port=QDRANT_PORT)
+    
+    filter_conditions = parse_filter_conditions(filters) if filters else None
+    
+    requests = []
+    for vector in query_vectors:
+        if hasattr(vector, 'tolist'):
+            vector = vector.tolist()
+        if collection_name.endswith("_texts"):
+            # Text collections store named vectors
+            vector = models.NamedVector(name="embed", vector=vector)
+        requests.append(models.SearchRequest(
+            vector=vector,
+            filter=filter_conditions,
+            limit=limit,
+            with_payload=True,
+            score_threshold=0.0,
+        ))
+    
+    if not client.collection_exists(collection_name=collection_name):
+        # A collection that was never created has no matches, as with /search
+        batch_results = [[] for _ in query_vectors]
+    else:
+        # Other errors (bad filter, wrong vector, Qdrant down) propagate to the
+        # caller: empty results would be indistinguishable from "no matches"
+        batch_results = client.search_batch(collection_name=collection_name, requests=requests)
+    
+    outputs = []
+    for search_results in batch_results:
+        result_data = []
+        for res in search_results:
+            data = res.payload.copy()
+            data['score'] = res.score
+            if select_cols != ["*"]:
+                data = {k: v for k, v in data.items() if k in select_cols}
+            result_data.append(data)
+        
+        if return_format == "pl":
+            outputs.append(pl.DataFrame(result_data))
+        elif return_format == "pd":
+            outputs.append(pd.DataFrame(result_data))
+        elif return_format == "arrow":
+            outputs.append(pl.DataFrame(result_data).to_arrow())
+        else:
+            outputs.append(result_data)
+    return outputs
+
+
 def qdrant_coordinate_search(
     collection_name: str,
     coordinate_vector: List[float],
@@ -390,13 +472,9 @@ def qdrant_hybrid_search(
     if text_query:
         try:
             # Generate embedding for text query
-            from fastembed import TextEmbedding
             from cfg.emb_settings import EMB_MODEL
             
-            embedding_model = TextEmbedding(model_name=EMB_MODEL)
-            search_vector = list(embedding_model.embed([text_query]))[0]
-            if hasattr(search_vector, 'tolist'):
-                search_vector = search_vector.tolist()
+            search_vector = embed_query(EMB_MODEL, text_query)
             
             semantic_results = client.search(
                 collection_name=collection_name,
@@ -1,43 +1,130 @@
 import os
 import datetime
 import base64
+import hashlib
 import io
+import json
 import logging
-from tempfile import NamedTemporaryFile
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
 import pymongo
+from PIL import Image
 from qdrant_client import QdrantClient
 from qdrant_client.http import models
-from transformers import AutoTokenizer
-from docling.chunking import HybridChunker  # type: ignore
-from fastembed import TextEmbedding, ImageEmbedding  # type: ignore
 from cfg.emb_settings import EMB_MODEL, IMG_EMB_MODEL, TABLE_EMB_MODEL, TABLE_CHUNK_MAX_TOKENS, TEXT_EMB_DIM, IMG_EMB_DIM, TABLE_EMB_DIM
+from cfg.emb_settings import INGEST_EMB_BATCH_SIZE, INGEST_IMG_EMB_BATCH_SIZE, INGEST_EMB_CACHE_ENABLED
+from cfg.ingest_settings import INGEST_PROFILES, DEFAULT_INGEST_PROFILE
+from cfg.ingest_settings import INGEST_UPSERT_BATCH_SIZE, INGEST_UPSERT_PARALLEL, INGEST_UPSERT_WAIT
+from cfg.ingest_settings import INGEST_BULK_LOAD, INGEST_INDEXING_THRESHOLD, INGEST_OPTIMIZE_TIMEOUT_SECONDS, INGEST_OPTIMIZE_POLL_SECONDS
 from cfg.table_format import TEXT_FORMAT, IMAGE_FORMAT, TABLE_FORMAT
-from .parse import table_convert, merge_adjacent_tables
+from .parse import merge_adjacent_tables
+from .table_chunker import chunk_tables
 from .math_transform import calculate_centroid, get_first_point, one_y_point
+from .model_registry import get_text_model, get_image_model, get_tokenizer, resolve_text_model
+from .emb_disk_cache import get_disk_cache
 
 logging.basicConfig(level=logging.INFO)
 
+POINT_ID_NAMESPACE = uuid.UUID("5f0c2a4e-3b7d-4e51-9a63-2d8f1c0b7e94")
+SCROLL_PAGE = 1024
+
+# Upsert batches of all stores of the process share these connections
+_upsert_pool = None
+_upsert_settings = {"batch_size": INGEST_UPSERT_BATCH_SIZE, "parallel": INGEST_UPSERT_PARALLEL, "wait": INGEST_UPSERT_WAIT}
+_upsert_pool_lock = threading.Lock()
+
+
+def _get_upsert_pool() -> ThreadPoolExecutor:
+    global _upsert_pool
+    with _upsert_pool_lock:
+        if _upsert_pool is None:
+            _upsert_pool = ThreadPoolExecutor(max_workers=_upsert_settings["parallel"], thread_name_prefix="qdrant-upsert")
+        return _upsert_pool
+
+
+def configure_upserts(batch_size: Optional[int] = None, parallel: Optional[int] = None, wait: Optional[bool] = None):
+    """Override the INGEST_UPSERT_* settings of this process (used by the ingestion benchmark)"""
+    global _upsert_pool
+    with _upsert_pool_lock:
+        if batch_size is not None:
+            _upsert_settings["batch_size"] = max(0, batch_size)
+        if wait is not None:
+            _upsert_settings["wait"] = wait
+        if parallel is not None and parallel != _upsert_settings["parallel"]:
+            _upsert_settings["parallel"] = max(1, parallel)
+            if _upsert_pool is not None:
+                _upsert_pool.shutdown(wait=True)
+                _upsert_pool = None
+
+
+# Payload fields that only say where a chunk is; they are kept out of its id
+POSITION_FIELDS = ("self_ref", "parent", "page", "coord", "coord_origin")
+
+
+def _normalize(value):
+    return " ".join(value.split()) if isinstance(value, str) else value
+
+
+def content_key(kind: str, payload: dict) -> str:
+    """Digest of a chunk's normalized content: its payload without file name and position"""
+    content = {k: _normalize(v) for k, v in payload.items() if k not in POSITION_FIELDS and k != "file_name"}
+    return hashlib.sha256(json.dumps([kind, content], sort_keys=True, default=str).encode()).hexdigest()
+
+
+def point_id(file_name: str, key: str, ordinal: int) -> str:
+    """
+    Deterministic point id of the `ordinal`-th chunk with content `key` in a
+    file: inserting or removing a page leaves the ids of all other chunks alone
+    """
+    return str(uuid.uuid5(POINT_ID_NAMESPACE, f"{file_name}\x00{key}\x00{ordinal}"))
+
+
 class QdrantVecStore:
-    def __init__(self, kb_name: str):
+    def __init__(self, kb_name: str, file_name: str = "", previous: Optional[dict] = None,
+                 profile: str = DEFAULT_INGEST_PROFILE, bulk: Optional[bool] = None):
+        """
+        `previous` is the index_info entry of an earlier ingest of `file_name`;
+        its collections are reused so that only changed chunks are written.
+        `profile` (INGEST_PROFILES) decides whether pictures and tables are indexed.
+        `bulk` (default INGEST_BULK_LOAD) creates new collections without HNSW
+        indexing until `finish()`.
+        """
         self.kb_name = kb_name.lower()
+        self.file_name = file_name
+        self.profile = INGEST_PROFILES[profile]
         self.server = os.getenv("QDRANT_HOST", "qdrant")
         self.port = int(os.getenv("QDRANT_PORT", "6333"))
-        ts = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
-        self.texts_collection_name = f"file_{ts}_texts"
-        self.images_collection_name = f"file_{ts}_images"
-        self.tables_collection_name = f"file_{ts}_tables"
+        # Files that start in the same second must not share collections
+        ts = f'{datetime.datetime.now().strftime("%Y%m%d%H%M%S")}_{uuid.uuid4().hex[:8]}'
+        previous = previous or {}
+        self.texts_collection_name = previous.get("texts_table_name") or f"file_{ts}_texts"
+        self.images_collection_name = previous.get("images_table_name") or f"file_{ts}_images"
+        self.tables_collection_name = previous.get("tables_table_name") or f"file_{ts}_tables"
+        # Ids produced by this ingest, per collection; everything else is pruned at the end
+        self.kept_ids = {name: set() for name in self.collection_names()}
+        # Ids first kept since the last take_window_state(), i.e. those of the current window
+        self._new_ids = {name: [] for name in self.collection_names()}
+        self.changes = {"embedded": 0, "unchanged": 0, "moved": 0, "deleted": 0}
+        # Occurrences of every content key so far (the ordinal of point_id), and those of the current window
+        self._ordinals = Counter()
+        self._new_ordinals = Counter()
+        # In-flight upsert batches, and one written point per collection for the final barrier
+        self._pending = []
+        self._last_points = {}
+        self.bulk = INGEST_BULK_LOAD if bulk is None else bulk
+        # Collections whose indexing is off and must be switched on by finish()
+        self._unindexed = set()
         self._connect_db()
 
         # Initialize embedding models
-        self.text_model = TextEmbedding(model_name=EMB_MODEL)
-        self.image_model = ImageEmbedding(model_name=IMG_EMB_MODEL)
-        self.table_model = TextEmbedding(model_name=TABLE_EMB_MODEL)
-        self.tokenizer = AutoTokenizer.from_pretrained(TABLE_EMB_MODEL)
-        self.chunker = HybridChunker(
-            tokenizer=self.tokenizer,
-            max_tokens=TABLE_CHUNK_MAX_TOKENS,
-            merge_peers=True,
-        )
+        self.text_model = get_text_model(EMB_MODEL, role="ingest_embed")
+        self.image_model = get_image_model(IMG_EMB_MODEL, role="ingest_embed")
+        self.table_model = get_text_model(TABLE_EMB_MODEL, role="ingest_embed")
+        self.tokenizer = get_tokenizer(TABLE_EMB_MODEL)
 
     def _connect_db(self):
         """Connect to Qdrant client and initialize collections if needed"""
@@ -46,35 +133,177 @@ class QdrantVecStore:
         # Create collections for this knowledge base if they don't exist
         for collection_name in [self.texts_collection_name, self.images_collection_name, self.tables_collection_name]:
             try:
-                self.client.get_collection(collection_name=collection_name)
+                info = self.client.get_collection(collection_name=collection_name)
                 print(f"Collection {collection_name} already exists")
+                # Left over from a bulk load that did not finish
+                if info.config.optimizer_config.indexing_threshold == 0:
+                    self._unindexed.add(collection_name)
             except Exception as e:
                 print(f"Creating collection {collection_name}")
+                # Bulk load: no HNSW graph is built while the points arrive
+                optimizers_config = models.OptimizersConfigDiff(indexing_threshold=0) if self.bulk else None
                 if collection_name == self.texts_collection_name:
                     self.client.create_collection(
                         collection_name=collection_name,
                         vectors_config={
                             "embed": models.VectorParams(size=TEXT_EMB_DIM, distance=models.Distance.COSINE),
                             "cord": models.VectorParams(size=2, distance=models.Distance.EUCLID),
-                        }
+                        },
+                        optimizers_config=optimizers_config,
                     )
                 elif collection_name == self.images_collection_name:
                     self.client.create_collection(
                         collection_name=collection_name,
-                        vectors_config=models.VectorParams(size=IMG_EMB_DIM, distance=models.Distance.COSINE)
+                        vectors_config=models.VectorParams(size=IMG_EMB_DIM, distance=models.Distance.COSINE),
+                        optimizers_config=optimizers_config,
                     )
                 elif collection_name == self.tables_collection_name:
                     self.client.create_collection(
                         collection_name=collection_name,
-                        vectors_config=models.VectorParams(size=TABLE_EMB_DIM, distance=models.Distance.COSINE)
+                        vectors_config=models.VectorParams(size=TABLE_EMB_DIM, distance=models.Distance.COSINE),
+                        optimizers_config=optimizers_config,
                     )
                 else:
                     raise ValueError(f"Unknown collection name: {collection_name}")
+                # prune() selects the points of one file by this field
+                self.client.create_payload_index(
+                    collection_name=collection_name,
+                    field_name="file_name",
+                    field_schema=models.PayloadSchemaType.KEYWORD,
+                )
+                if self.bulk:
+                    self._unindexed.add(collection_name)
+
+    def collection_names(self) -> list:
+        return [self.texts_collection_name, self.images_collection_name, self.tables_collection_name]
+
+    def _point_ids(self, kind: str, payloads: list) -> list:
+        ids = []
+        for payload in payloads:
+            key = content_key(kind, payload)
+            self._ordinals[key] += 1
+            self._new_ordinals[key] += 1
+            ids.append(point_id(self.file_name, key, self._ordinals[key]))
+        return ids
+
+    def _select_changed(self, collection_name: str, ids: list, payloads: list):
+        """
+        Record `ids` as kept and return (changed, moved): the indexes of those
+        not yet stored in `collection_name`, i.e. the chunks that still need
+        embedding, and of stored ones whose position fields differ from
+        `payloads`. Duplicate ids within `ids` are only returned once.
+        """
+        kept = self.kept_ids[collection_name]
+        candidates = {}
+        for i, pid in enumerate(ids):
+            if pid not in kept and pid not in candidates:
+                candidates[pid] = i
+        kept.update(candidates)
+        self._new_ids[collection_name].extend(candidates)
+        existing = {}
+        if candidates:
+            found = self.client.retrieve(
+                collection_name=collection_name,
+                ids=list(candidates),
+                with_payload=list(POSITION_FIELDS),
+                with_vectors=False,
+            )
+            existing = {str(point.id): point.payload or {} for point in found}
+        changed, moved = [], []
+        for pid, i in candidates.items():
+            if pid not in existing:
+                changed.append(i)
+            elif any(existing[pid].get(k) != payloads[i][k] for k in POSITION_FIELDS if k in payloads[i]):
+                moved.append(i)
+        self.changes["unchanged"] += len(existing) - len(moved)
+        self.changes["moved"] += len(moved)
+        self.changes["embedded"] += len(changed)
+        return changed, moved
+
+    def _move_points(self, collection_name: str, ids: list, payloads: list, moved: list, vectors: Optional[dict] = None):
+        """
+        Write the new position fields of chunks that only moved, and their
+        `vectors` by chunk index (the text "cord" vector)
+        """
+        if not moved:
+            return
+        operations = []
+        for i in moved:
+            position = {k: payloads[i][k] for k in POSITION_FIELDS if k in payloads[i]}
+            operations.append(models.SetPayloadOperation(
+                set_payload=models.SetPayload(payload=position, points=[ids[i]])
+            ))
+            if vectors is not None:
+                operations.append(models.UpdateVectorsOperation(
+                    update_vectors=models.UpdateVectors(points=[models.PointVectors(id=ids[i], vector=vectors[i])])
+                ))
+        self.client.batch_update_points(collection_name=collection_name, update_operations=operations)
+
+    def take_window_state(self) -> dict:
+        """
+        What a window checkpoint records: the ids kept per collection and the
+        content-key occurrences since the last call
+        """
+        state = {"ids": self._new_ids, "ordinals": dict(self._new_ordinals)}
+        self._new_ids = {name: [] for name in self.collection_names()}
+        self._new_ordinals = Counter()
+        return state
+
+    def restore(self, kept_ids: dict, changes: dict, ordinals: dict):
+        """
+        Continue an interrupted ingest: the ids its uploaded windows produced
+        are kept by `prune()`, its content-key occurrences continue and its
+        change counts are carried over
+        """
+        for collection_name, ids in kept_ids.items():
+            if collection_name in self.kept_ids:
+                self.kept_ids[collection_name].update(ids)
+        self._ordinals.update(ordinals)
+        for key, count in changes.items():
+            self.changes[key] = self.changes.get(key, 0) + count
+
+    def prune(self) -> dict:
+        """
+        Delete points of earlier ingests of this file that this ingest did not
+        produce; returns point counts per collection. Only points with this
+        file_name (or none, written before points carried one) are considered.
+        """
+        own_points = models.Filter(should=[
+            models.FieldCondition(key="file_name", match=models.MatchValue(value=self.file_name)),
+            models.IsEmptyCondition(is_empty=models.PayloadField(key="file_name")),
+        ])
+        counts = {}
+        for collection_name in self.collection_names():
+            kept = self.kept_ids[collection_name]
+            stale = []
+            offset = None
+            while True:
+                records, offset = self.client.scroll(
+                    collection_name=collection_name,
+                    scroll_filter=own_points,
+                    limit=SCROLL_PAGE,
+                    offset=offset,
+                    with_payload=False,
+                    with_vectors=False,
+                )
+                stale.extend(record.id for record in records if str(record.id) not in kept)
+                if offset is None:
+                    break
+            if stale:
+                self.client.delete(
+                    collection_name=collection_name,
+                    points_selector=models.PointIdsList(points=stale),
+                )
+            self.changes["deleted"] += len(stale)
+            counts[collection_name] = len(kept)
+        logging.info(f"{self.file_name}: {self.changes['embedded']} chunks embedded, {self.changes['unchanged']} unchanged, {self.changes['deleted']} deleted")
+        return counts
 
     def _common_transform(self, data: dict) -> dict:
         """Transform common fields between different data types"""
         prov = data.get("prov", [{}])[0]
         row = {
+            "file_name": self.file_name,
             "self_ref": data.get("self_ref"),
             "parent": data.get("parent", {}).get("$ref"),
             "content_layer": data.get("content_layer"),
@@ -96,124 +325,244 @@ class QdrantVecStore:
         return row
 
     def image_transform(self, data: dict) -> dict:
-        """Transform image data for Qdrant storage"""
+        """Transform image data for Qdrant storage, returning the payload and raw image bytes"""
         row = self._common_transform(data)
         image_info = data.get("image", {})
         uri = image_info.get("uri", "")
         encoded = uri.split(",", 1)[1] if "," in uri else uri
         img_bytes = base64.b64decode(encoded)
-        with NamedTemporaryFile(suffix='.png') as tmp:
-            tmp.write(img_bytes)
-            tmp.flush()
-            emb = list(self.image_model.embed([tmp.name]))[0]
         row.update({
             "image": encoded,
             "dpi": image_info.get("dpi"),
             "size": list(image_info.get("size", {}).values()),
             "type": image_info.get("mimetype"),
         })
-        return row, emb
+        return row, img_bytes
 
     def table_transform(self, chunk) -> dict:
         """Transform table data for Qdrant storage"""
-        txt = chunk.text
-        emb = list(self.table_model.embed([txt]))[0]
-        return {"text": txt}, emb
+        return {"file_name": self.file_name, "text": chunk["text"]}
 
-    def save(self, file_name: str, data: dict, meta_data) -> dict:
-        """Save data to Qdrant and return status information"""
-        status = {
+    def embed_texts(self, model_name: str, texts: list, dim: int) -> list:
+        """Embed texts in batches of INGEST_EMB_BATCH_SIZE, reusing vectors from the disk cache"""
+        model = get_text_model(model_name, role="ingest_embed")
+
+        def run_model(batch: list) -> list:
+            return list(model.embed(batch, batch_size=INGEST_EMB_BATCH_SIZE))
+
+        if not INGEST_EMB_CACHE_ENABLED:
+            return run_model(texts)
+        return get_disk_cache(resolve_text_model(model_name), dim).embed(texts, run_model)
+
+    def embed_images(self, images: list) -> list:
+        """Decode image bytes in memory and embed them in batches of INGEST_IMG_EMB_BATCH_SIZE"""
+        embeds = []
+        for start in range(0, len(images), INGEST_IMG_EMB_BATCH_SIZE):
+            batch = [
+                Image.open(io.BytesIO(img_bytes)).convert("RGB")
+                for img_bytes in images[start:start + INGEST_IMG_EMB_BATCH_SIZE]
+            ]
+            embeds.extend(self.image_model.embed(batch, batch_size=len(batch)))
+        return embeds
+
+    def text_points(self, data: dict) -> list:
+        """Embed the changed texts of a converted document and build their points"""
+        texts = [self.text_transform(t) for t in data.get("texts", [])]
+        if not texts:
+            return []
+        ids = self._point_ids("text", texts)
+        changed, moved = self._select_changed(self.texts_collection_name, ids, texts)
+        cords = {i: {"cord": self._cord(texts[i])} for i in moved}
+        self._move_points(self.texts_collection_name, ids, texts, moved, cords)
+        if not changed:
+            return []
+        embeds = self.embed_texts(EMB_MODEL, [texts[i]["text"] or "" for i in changed], TEXT_EMB_DIM)
+
+        points = []
+        for i, vector in zip(changed, embeds):
+            points.append(models.PointStruct(
+                id=ids[i],
+                vector={
+                    "embed": vector.tolist() if hasattr(vector, 'tolist') else vector,
+                    "cord": self._cord(texts[i]),
+                },
+                payload=texts[i]
+            ))
+        return points
+
+    @staticmethod
+    def _cord(text: dict) -> list:
+        cord = text.get("coord", [])
+        # calculate_centroid(cord) if len(cord)==4 else [0.0, 0.0]
+        return one_y_point(cord) if len(cord) == 4 else [0.0, 0.0]
+
+    def image_points(self, data: dict) -> list:
+        """Embed the changed pictures of a converted document and build their points"""
+        pics = data.get("pictures", [])
+        if not pics or not self.profile["pictures"]:
+            return []
+        transformed = [self.image_transform(img) for img in pics]
+        payloads = [payload for payload, _ in transformed]
+        ids = self._point_ids("image", payloads)
+        changed, moved = self._select_changed(self.images_collection_name, ids, payloads)
+        self._move_points(self.images_collection_name, ids, payloads, moved)
+        if not changed:
+            return []
+        embeds = self.embed_images([transformed[i][1] for i in changed])
+        points = []
+        for i, vector in zip(changed, embeds):
+            points.append(models.PointStruct(
+                id=ids[i],
+                vector=vector.tolist() if hasattr(vector, 'tolist') else vector,
+                payload=transformed[i][0]
+            ))
+        return points
+
+    def table_points(self, meta_data) -> list:
+        """Chunk the tables of a converted document, embed the changed chunks and build their points"""
+        if meta_data is None or not getattr(meta_data.document, "tables", None) or not self.profile["tables"]:
+            return []
+        all_tabs = merge_adjacent_tables(meta_data)
+        chunks = chunk_tables(all_tabs, self.tokenizer, TABLE_CHUNK_MAX_TOKENS)
+
+        payloads = [self.table_transform(chunk) for chunk in chunks]
+        ids = self._point_ids("table", payloads)
+        # Table chunks carry no position, so they are never just moved
+        changed, _ = self._select_changed(self.tables_collection_name, ids, payloads)
+        if not changed:
+            return []
+        embeds = self.embed_texts(TABLE_EMB_MODEL, [payloads[i]["text"] for i in changed], TABLE_EMB_DIM)
+        points = []
+        for i, vector in zip(changed, embeds):
+            points.append(models.PointStruct(
+                id=ids[i],
+                vector=vector.tolist() if hasattr(vector, 'tolist') else vector,
+                payload=payloads[i]
+            ))
+        return points
+
+    def upsert_points(self, collection_name: str, points: list):
+        """
+        Send `points` in batches over the shared upsert connections and return
+        right away, so the caller can embed the next window meanwhile.
+        `flush()` waits for every batch sent so far.
+        """
+        if not points:
+            return
+        pool = _get_upsert_pool()
+        # Batch size 0: one request for all points
+        batch_size, wait = _upsert_settings["batch_size"] or len(points), _upsert_settings["wait"]
+        for start in range(0, len(points), batch_size):
+            # Bound the batches in flight (and the memory they hold)
+            while len(self._pending) >= 2 * _upsert_settings["parallel"]:
+                self._pending.pop(0).result()
+            self._pending.append(pool.submit(
+                self.client.upsert,
+                collection_name=collection_name,
+                points=points[start:start + batch_size],
+                wait=wait,
+            ))
+        self._last_points[collection_name] = points[-1]
+
+    def wait_sent(self):
+        """Wait until Qdrant has acknowledged (logged, not necessarily applied) every batch sent so far"""
+        pending, self._pending = self._pending, []
+        errors = []
+        for future in pending:
+            try:
+                future.result()
+            except Exception as e:
+                errors.append(e)
+        if errors:
+            raise errors[0]
+
+    def flush(self):
+        """
+        Consistency barrier: wait until every batch is acknowledged, then
+        re-upsert one already written point per collection with wait=True.
+        Qdrant applies a collection's updates in order, so once it returns
+        all earlier wait=False batches are applied and searchable.
+        """
+        self.wait_sent()
+        for collection_name, point in self._last_points.items():
+            self.client.upsert(collection_name=collection_name, points=[point], wait=True)
+        self._last_points = {}
+
+    def _index_built(self, collection_name: str) -> bool:
+        """
+        GREEN alone is not enough: right after indexing is switched on a
+        collection can still be GREEN before the optimizer picked up the new
+        threshold. The index is built once the indexed vectors have caught up
+        with the points, or if the segments are too small for Qdrant to index
+        them at all (searched by full scan).
+        """
+        info = self.client.get_collection(collection_name=collection_name)
+        if info.status != models.CollectionStatus.GREEN:
+            return False
+        points = info.points_count or 0
+        if (info.indexed_vectors_count or 0) >= points:
+            return True
+        vectors = info.config.params.vectors
+        dims = sum(v.size for v in vectors.values()) if isinstance(vectors, dict) else vectors.size
+        segment_kb = points * dims * 4 / 1024 / max(info.segments_count or 1, 1)
+        return segment_kb < INGEST_INDEXING_THRESHOLD
+
+    def build_indexes(self) -> bool:
+        """
+        Switch HNSW indexing back on for bulk-loaded collections and wait until
+        Qdrant has finished optimizing them. Returns False on timeout; the
+        index then keeps building in the background.
+        """
+        for collection_name in self._unindexed:
+            self.client.update_collection(
+                collection_name=collection_name,
+                optimizers_config=models.OptimizersConfigDiff(indexing_threshold=INGEST_INDEXING_THRESHOLD),
+            )
+        deadline = time.monotonic() + INGEST_OPTIMIZE_TIMEOUT_SECONDS
+        waiting = set(self._unindexed)
+        while waiting:
+            waiting = {name for name in waiting if not self._index_built(name)}
+            if not waiting:
+                break
+            if time.monotonic() > deadline:
+                logging.warning(f"{self.file_name}: {sorted(waiting)} still optimizing after {INGEST_OPTIMIZE_TIMEOUT_SECONDS}s")
+                return False
+            time.sleep(INGEST_OPTIMIZE_POLL_SECONDS)
+        self._unindexed = set()
+        return True
+
+    def finish(self) -> dict:
+        """
+        Wait for the upserts, prune stale points and (after a bulk load) build
+        the indexes, then return the status dict; a collection without points
+        is reported as ''
+        """
+        self.flush()
+        counts = self.prune()
+        indexed = self.build_indexes()
+        return {
             "status": "success",
-            "texts_collection_name": self.texts_collection_name,
-            "images_collection_name": self.images_collection_name,
-            "tables_collection_name": self.tables_collection_name,
+            "texts_collection_name": self.texts_collection_name if counts[self.texts_collection_name] else "",
+            "images_collection_name": self.images_collection_name if counts[self.images_collection_name] else "",
+            "tables_collection_name": self.tables_collection_name if counts[self.tables_collection_name] else "",
+            "changes": dict(self.changes),
+            "indexed": indexed,
         }
+
+    def save(self, file_name: str, data: dict, meta_data) -> dict:
+        """Save data to Qdrant and return status information"""
+        self.file_name = file_name
         logging.info(f"texts_collection_name: {self.texts_collection_name}")
         logging.info(f"images_collection_name: {self.images_collection_name}")
         logging.info(f"tables_collection_name: {self.tables_collection_name}")
         logging.info(f"file_name: {file_name}")
         # Process text data
-        pure_texts = [t.get("text", "") for t in data.get("texts", [])]
-        if pure_texts:
-            embeds = list(self.text_model.embed(pure_texts))
-            texts = [self.text_transform(t) for t in data.get("texts", [])]
-            cords = [t.get("coord", []) for t in texts]
-
-            # Insert into Qdrant
-            points = []
-            for i, text in enumerate(texts):
-                points.append(models.PointStruct(
-                    id=i,
-                    vector={
-                        "embed": embeds[i].tolist() if hasattr(embeds[i], 'tolist') else embeds[i],
-                        # "cord": calculate_centroid(cords[i]) if len(cords[i])==4 else [0.0, 0.0]
-                        "cord": one_y_point(cords[i]) if len(cords[i]) == 4 else [0.0, 0.0]
-                    },
-                    payload=text
-                ))
-            
-            if points:
-                self.client.upsert(
-                    collection_name=self.texts_collection_name,
-                    points=points
-                )
-        else:
-            status["texts_collection_name"] = ""
-
+        self.upsert_points(self.texts_collection_name, self.text_points(data))
         # Process image data
-        pics = data.get("pictures", [])
-        if pics:
-            points = []
-            for i, img in enumerate(pics):
-                payload, vector = self.image_transform(img)
-                points.append(models.PointStruct(
-                    id=i,
-                    vector=vector.tolist() if hasattr(vector, 'tolist') else vector,
-                    payload=payload
-                ))
-            
-            if points:
-                self.client.upsert(
-                    collection_name=self.images_collection_name,
-                    points=points
-                )
-        else:
-            status["images_collection_name"] = ""
-
+        self.upsert_points(self.images_collection_name, self.image_points(data))
         # Process table data
-        tables = []
-        if getattr(meta_data.document, "tables", None):
-            all_tabs = merge_adjacent_tables(meta_data)
-            md = "\n\n\n".join(tbl.to_markdown(index=False) for tbl in all_tabs)
-            # write to md file
-            with NamedTemporaryFile(suffix='.md', delete=False) as tmp:
-                tmp.write(md.encode())
-                tmp.flush()
-                # Convert to pure doc
-            pure_doc = table_convert(tmp.name)
-            chunks = list(self.chunker.chunk(dl_doc=pure_doc))
-            
-            points = []
-            for i, chunk in enumerate(chunks):
-                payload, vector = self.table_transform(chunk)
-                points.append(models.PointStruct(
-                    id=i,
-                    vector=vector.tolist() if hasattr(vector, 'tolist') else vector,
-                    payload=payload
-                ))
-            
-            # Remove the temporary file
-            os.remove(tmp.name)
-            
-            if points:
-                self.client.upsert(
-                    collection_name=self.tables_collection_name,
-                    points=points
-                )
-        else:
-            status["tables_collection_name"] = ""
-
-        return status
+        self.upsert_points(self.tables_collection_name, self.table_points(meta_data))
+        return self.finish()
 
     @staticmethod
     def list_all_collections(kb_name: str):
@@ -243,11 +592,28 @@ class QdrantVecStore:
         return coll.find_one({"kb_name": kb_name}, {"_id": 0})
 
 
+def relabel_points(entry: dict, file_name: str):
+    """
+    Hand the points of index_info `entry` over to `file_name`: its file_name
+    payload is rewritten, so that prune() of the new owner manages them and
+    that of the old owner no longer touches them
+    """
+    client = QdrantClient(host=os.getenv("QDRANT_HOST", "qdrant"), port=int(os.getenv("QDRANT_PORT", "6333")))
+    owned = models.Filter(should=[
+        models.FieldCondition(key="file_name", match=models.MatchValue(value=entry["file_name"])),
+        models.IsEmptyCondition(is_empty=models.PayloadField(key="file_name")),
+    ])
+    for key in ("texts_table_name", "images_table_name", "tables_table_name"):
+        if entry.get(key):
+            client.set_payload(collection_name=entry[key], payload={"file_name": file_name}, points=owned)
+
+
 # Backward compatibility functions
-def save_vec_store(kb_name: str, file_name: str, data: dict, meta_data) -> dict:
+def save_vec_store(kb_name: str, file_name: str, data: dict, meta_data, previous: Optional[dict] = None,
+                   profile: str = DEFAULT_INGEST_PROFILE) -> dict:
     """Save data to vector store using QdrantVecStore"""
     logging.info(f"Saving to vector store: {kb_name}, {file_name}")
-    qdrantvec = QdrantVecStore(kb_name)
+    qdrantvec = QdrantVecStore(kb_name, file_name, previous, profile)
     return qdrantvec.save(file_name, data, meta_data)
 
 
@@ -0,0 +1,123 @@
+"""
+Query embedding cache
+
+A single /search request embeds the same query once per table, and users
+repeat the same questions all day. `embed_query` puts a bounded LRU cache with
+TTL eviction in front of the shared models from `model_registry`, keyed by
+(model name, normalized query text), so repeated queries skip ONNX inference.
+The normalized text is also what gets embedded.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable, List, Optional
+
+from cfg.emb_settings import QUERY_CACHE_MAX_ENTRIES, QUERY_CACHE_TTL_SECONDS
+from .model_registry import get_text_model
+from .embed_batcher import get_batcher
+
+
+def normalize_query(text: str) -> str:
+    """Collapse whitespace so trivially different spellings share an entry."""
+    return " ".join(text.split())
+
+
+class QueryEmbeddingCache:
+    def __init__(self, max_entries: int = QUERY_CACHE_MAX_ENTRIES, ttl: float = QUERY_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        # key -> (expires_at, vector)
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[list]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            expires_at, vector = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return vector
+
+    def put(self, key: Hashable, vector: list):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, vector)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+
+query_cache = QueryEmbeddingCache()
+
+
+def embed_query(model_name: str, text: str) -> list:
+    """Return the embedding of `text` under `model_name`, served from cache when possible."""
+    # The normalized text is both the key and what is embedded, so every
+    # spelling sharing an entry gets the same vector
+    text = normalize_query(text)
+    key = (model_name, text)
+    vector = query_cache.get(key)
+    if vector is not None:
+        return vector
+    vector = list(get_text_model(model_name).embed([text]))[0]
+    if hasattr(vector, 'tolist'):
+        vector = vector.tolist()
+    query_cache.put(key, vector)
+    return vector
+
+
+
+def embed_queries(model_name: str, texts: List[str]) -> List[list]:
+    """Embed several queries with one model call over the cache misses."""
+    texts = [normalize_query(t) for t in texts]
+    keys = [(model_name, t) for t in texts]
+    vectors = [query_cache.get(k) for k in keys]
+    missing = [i for i, v in enumerate(vectors) if v is None]
+    if missing:
+        embeds = get_text_model(model_name).embed([texts[i] for i in missing])
+        for i, emb in zip(missing, embeds):
+            vector = emb.tolist() if hasattr(emb, 'tolist') else emb
+            query_cache.put(keys[i], vector)
+            vectors[i] = vector
+    return vectors
+
+
+async def aembed_query(model_name: str, text: str) -> list:
+    """Async variant of `embed_query`; cache misses go through the micro-batcher."""
+    text = normalize_query(text)
+    key = (model_name, text)
+    vector = query_cache.get(key)
+    if vector is not None:
+        return vector
+    vector = await get_batcher(model_name).embed(text)
+    query_cache.put(key, vector)
+    return vector
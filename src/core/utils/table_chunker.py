@@ -0,0 +1,67 @@
+"""
+Token-bounded table chunks straight from DataFrames
+
+Tables used to be rendered to markdown, written to a temp file, re-parsed by a
+second docling conversion and only then split by HybridChunker. `chunk_tables`
+works on the merged DataFrames instead: every chunk is the table header
+followed by as many consecutive rows as fit into `max_tokens`, so each chunk
+keeps its column context on its own.
+"""
+
+from typing import List
+
+import pandas as pd
+
+CELL_SEP = " | "
+
+
+def _has_header(df: pd.DataFrame) -> bool:
+    """docling falls back to 0..n column labels when it found no header row"""
+    return list(df.columns) != list(range(len(df.columns)))
+
+
+def _cell(value) -> str:
+    return "" if pd.isna(value) else " ".join(str(value).split())
+
+
+def table_rows(df: pd.DataFrame) -> List[str]:
+    return [CELL_SEP.join(_cell(v) for v in row) for row in df.itertuples(index=False, name=None)]
+
+
+def chunk_table(df: pd.DataFrame, tokenizer, max_tokens: int) -> List[dict]:
+    """
+    Split one table into chunks of {"text", "rows": [first, last]}; a row that
+    alone exceeds the budget becomes a chunk of its own.
+    """
+    rows = table_rows(df)
+    if not rows:
+        return []
+    header = CELL_SEP.join(_cell(c) for c in df.columns) if _has_header(df) else ""
+    # One tokenizer call for the whole table
+    lengths = [len(ids) for ids in tokenizer([header] + rows, add_special_tokens=False)["input_ids"]]
+    header_len, row_lens = lengths[0], lengths[1:]
+
+    chunks = []
+    start, used = 0, header_len
+    for i, row_len in enumerate(row_lens):
+        if i > start and used + row_len > max_tokens:
+            chunks.append((start, i))
+            start, used = i, header_len
+        used += row_len
+    chunks.append((start, len(rows)))
+
+    prefix = [header] if header else []
+    return [
+        {"text": "\n".join(prefix + rows[first:last]), "rows": [first, last - 1]}
+        for first, last in chunks
+    ]
+
+
+def chunk_tables(tables: List[pd.DataFrame], tokenizer, max_tokens: int) -> List[dict]:
+    """Chunks of all tables, each tagged with the index of its table"""
+    chunks = []
+    for idx, df in enumerate(tables):
+        for chunk in chunk_table(df, tokenizer, max_tokens):
+            chunk["table"] = idx
+            chunks.append(chunk)
+    return chunks
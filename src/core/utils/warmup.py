@@ -0,0 +1,75 @@
+"""
+Startup model preloading
+
+`start_preload` loads every configured model in a background thread and runs
+one warm-up inference through each, so the first /search or /process_file on
+a fresh container does not pay for downloads and ONNX session creation.
+`readiness` reports the progress for the /ready endpoint.
+"""
+
+import logging
+import threading
+import time
+import traceback
+
+from PIL import Image
+
+from cfg.emb_settings import EMB_MODEL, IMG_EMB_MODEL, IMG_CLIP_EMB_MODEL, TABLE_EMB_MODEL
+from .model_registry import get_text_model, get_image_model, get_tokenizer
+
+_state = {
+    "ready": False,
+    "error": None,
+    "started_at": None,
+    "finished_at": None,
+    "steps": {},
+}
+_lock = threading.Lock()
+_thread = None
+
+
+def _step(name: str, fn):
+    t0 = time.perf_counter()
+    fn()
+    _state["steps"][name] = round(time.perf_counter() - t0, 3)
+    logging.info(f"Preloaded {name} in {_state['steps'][name]}s")
+
+
+def preload_ingest_models():
+    """Load and warm up the models used by ingestion."""
+    from .parse import warmup as docling_warmup
+
+    for model_name in dict.fromkeys([EMB_MODEL, TABLE_EMB_MODEL]):
+        _step(f"ingest_embed:{model_name}", lambda m=model_name: list(get_text_model(m, role="ingest_embed").embed(["warmup"])))
+    _step(f"ingest_embed:{IMG_EMB_MODEL}", lambda: list(get_image_model(IMG_EMB_MODEL).embed([Image.new("RGB", (32, 32))])))
+    _step(f"tokenizer:{TABLE_EMB_MODEL}", lambda: get_tokenizer(TABLE_EMB_MODEL)("warmup"))
+    _step("docling", docling_warmup)
+
+
+def preload_models(ingest: bool = True):
+    """Load and warm up every model used by the query (and, if `ingest`, ingestion) paths."""
+    _state["started_at"] = time.time()
+    try:
+        for model_name in dict.fromkeys([EMB_MODEL, IMG_CLIP_EMB_MODEL]):
+            _step(f"query_embed:{model_name}", lambda m=model_name: list(get_text_model(m).embed(["warmup"])))
+        if ingest:
+            preload_ingest_models()
+        _state["ready"] = True
+    except Exception:
+        _state["error"] = traceback.format_exc()
+        logging.error(f"Model preloading failed:\n{_state['error']}")
+    finally:
+        _state["finished_at"] = time.time()
+
+
+def start_preload(ingest: bool = True):
+    """Start preloading in a daemon thread (no-op if already started)."""
+    global _thread
+    with _lock:
+        if _thread is None:
+            _thread = threading.Thread(target=preload_models, args=(ingest,), name="model-preload", daemon=True)
+            _thread.start()
+
+
+def readiness() -> dict:
+    return dict(_state, steps=dict(_state["steps"]))
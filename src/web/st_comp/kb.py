@@ -1,6 +1,7 @@
 import streamlit as st
 import requests
 import os
+import time
 import base64
 
 import pandas as pd
@@ -98,8 +99,25 @@ def view_kb_dialog(kb_name:str):
                     # Send request to core
                     res = requests.post(f"{CORE_SERVER}/process_file", json=payload)
                     if res.status_code == 200 and res.json()["status"] == "success":
-                        st.success("Processing success!")
-                        st.balloons()
+                        job_id = res.json()["job_id"]
+                        st.info(f"Processing queued (job {job_id})")
+                        # Poll the job until the core workers finish it
+                        placeholder = st.empty()
+                        while True:
+                            job = requests.get(f"{CORE_SERVER}/jobs/{job_id}").json()["job"]
+                            job_table = "| Filename | Stage | Status |\n|----------|-------|--------|\n"
+                            for file in job["files"]:
+                                job_table += f"| {file['file_name']} | {file['stage']} | {file['status']} |\n"
+                            placeholder.markdown(job_table)
+                            if job["status"] not in ("queued", "running"):
+                                break
+                            time.sleep(2)
+                        if job["status"] == "success":
+                            st.success("Processing success!")
+                            st.balloons()
+                        else:
+                            errors = [f"{f['file_name']}: {f['error']}" for f in job["files"] if f.get("error")]
+                            st.error(f"Error: {job.get('error') or chr(10).join(errors) or 'Unknown error'}")
                     else:
                         st.error(f"Error: {res.json().get('message', 'Unknown error')}")
                 else:
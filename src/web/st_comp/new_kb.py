@@ -8,7 +8,8 @@ def new_kb(data:dict):
         "name": "Knowledge Base Name",
         "desc": "Knowledge Base Description",
         "icon": "Knowledge Base Icon",
-        "owner": "Owner Username"
+        "owner": "Owner Username",
+        "ingest_profile": "full"
     }
     """
     url = os.getenv("BACKEND_SERVER", "http://localhost:8000") + "/new_kb"
@@ -16,7 +17,8 @@ def new_kb(data:dict):
         "name": data["name"],
         "desc": data["desc"],
         "icon": data["icon"],
-        "owner": data["owner"]
+        "owner": data["owner"],
+        "ingest_profile": data.get("ingest_profile", "full")
     }
     headers = {
         "Content-Type": "application/json"
@@ -33,6 +35,12 @@ def new_kb_dialog():
     name = st.text_input("New KB Name", max_chars=20)
     desc = st.text_input("Description")
     icon = st.selectbox("Icon",['📚','📖','📕','📗','📘','📙','📔','📒','📚','📓','📃','📜','📄','📰','🗞️','📑','🔖','🏷️','📎','🖇️','📌','📍','📏','📐','🗂️','📁','📂','🗃️','🗄️','🗑️','🔒','🔓','🔏','🔐','🔑','🗝️','🔨','⛏️','🛠️','🗡️','🔫','🏹','🛡️','🔧','🔩','🗜️','🔗','⛓️','🧰','🧲','🔬','🔭','📡','💉','💊','🚪','🛏️','🛋️','🚽','🚿','🛁','🪒','🧴','🧷','🧹','🧺','🧻','🧼','🧽','🧯','🛒','🚬','🗿','🏧','🚮','🚰','🚹','🚺','🚻','🚼','🚾','🛂','🛃','🛄','🛅','🚸','⛔','🚫','🚳','🚭','🚯','🚱','🚷','📵','🔞'])
+    profiles = {
+        "Full (text, tables, images)": "full",
+        "Text and tables": "text_tables",
+        "Text only (fastest)": "text",
+    }
+    profile = st.selectbox("Ingestion profile", list(profiles))
     if st.button("Create",key="new_kb_btn"):
         if name == "":
             st.error("Please enter a name for the new knowledge base.")
@@ -50,7 +58,8 @@ def new_kb_dialog():
             "name": name,
             "desc": desc,
             "icon": icon,
-            "owner": st.session_state.username
+            "owner": st.session_state.username,
+            "ingest_profile": profiles[profile]
         }
         result = new_kb(data)
         if result: